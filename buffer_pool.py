@@ -0,0 +1,47 @@
+"""
+Reusable byte buffers, so steady traffic doesn't allocate a fresh large buffer per request
+"""
+
+from contextlib import contextmanager
+from queue import Empty, SimpleQueue
+from typing import Iterator
+
+
+class BufferPool:
+    """
+    Free list of equally sized bytearrays.
+
+    Requests that fit in a pooled buffer borrow one and give it back when done;
+    larger requests, or requests made while every buffer is lent out, get a
+    one-off bytearray that is simply dropped afterwards.
+    """
+
+    def __init__(self, count: int, size: int):
+        self.count = count
+        self.size = size
+        self._free: "SimpleQueue[bytearray]" = SimpleQueue()
+        for _ in range(count):
+            self._free.put(bytearray(size))
+
+    @contextmanager
+    def acquire(self, min_size: int) -> Iterator[bytearray]:
+        """
+        Borrow a buffer of at least min_size bytes.
+
+        The buffer's contents are undefined and it must not be used after the
+        block exits.
+        """
+        if min_size > self.size:
+            yield bytearray(min_size)
+            return
+
+        try:
+            buffer = self._free.get_nowait()
+        except Empty:
+            buffer = bytearray(self.size)
+
+        try:
+            yield buffer
+        finally:
+            if self._free.qsize() < self.count:
+                self._free.put(buffer)
@@ -0,0 +1,98 @@
+"""
+Streaming JSON bodies with base64-encoded binary fields for API responses
+"""
+
+import binascii
+import json
+from typing import Any, Iterator
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the stdlib encoder gives the same JSON
+    orjson = None
+
+
+# Must be a multiple of 3 so the encoded chunks concatenate without padding
+BASE64_CHUNK_SIZE = 3 * 16 * 1024
+
+
+class Base64:
+    """Binary value to be written into a JSON body as a base64 string"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+def _dumps(value: Any) -> bytes:
+    """Encode a JSON value to UTF-8 bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode('utf-8')
+
+
+def iter_base64(data, chunk_size: int = BASE64_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Base64-encode a buffer piece by piece.
+
+    Args:
+        data: Bytes or any bytes-like buffer
+        chunk_size: Input bytes per chunk (multiple of 3)
+
+    Returns:
+        Iterator over ASCII chunks that together form the encoding of data
+    """
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield binascii.b2a_base64(view[start:start + chunk_size], newline=False)
+
+
+def iter_json(value: Any) -> Iterator[bytes]:
+    """
+    Serialize a JSON-compatible value chunk by chunk.
+
+    Dicts and lists are walked recursively and Base64 values are encoded in
+    chunks, so the full base64 string of a large PDF or image never has to
+    exist in memory. Everything else is encoded with orjson (or json). Small pieces
+    are batched so each yielded chunk is roughly BASE64_CHUNK_SIZE bytes.
+
+    Example:
+        >>> StreamingResponse(iter_json({"blob": Base64(data)}), media_type="application/json")
+    """
+    pending = []
+    pending_size = 0
+    for part in _iter_json_parts(value):
+        pending.append(part)
+        pending_size += len(part)
+        if pending_size >= BASE64_CHUNK_SIZE:
+            yield b''.join(pending)
+            pending = []
+            pending_size = 0
+
+    if pending:
+        yield b''.join(pending)
+
+
+def _iter_json_parts(value: Any) -> Iterator[bytes]:
+    if isinstance(value, Base64):
+        yield b'"'
+        yield from iter_base64(value.data)
+        yield b'"'
+    elif isinstance(value, dict):
+        yield b'{'
+        for i, (key, item) in enumerate(value.items()):
+            if i:
+                yield b','
+            yield _dumps(str(key)) + b':'
+            yield from _iter_json_parts(item)
+        yield b'}'
+    elif isinstance(value, (list, tuple)):
+        yield b'['
+        for i, item in enumerate(value):
+            if i:
+                yield b','
+            yield from _iter_json_parts(item)
+        yield b']'
+    else:
+        yield _dumps(value)
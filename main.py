@@ -2,9 +2,25 @@
 Main entry point for running the Docling API server
 """
 
+import os
+
 import uvicorn
 from api import app  # Import app for Vercel
 
 
 if __name__ == "__main__":
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
+    if os.getenv("DEV"):
+        # Auto-reload only works with a single worker
+        uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
+    else:
+        uvicorn.run(
+            "api:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+            loop="uvloop",
+            http="httptools",
+            # Beyond this many open connections, answer 503 instead of queueing more uploads
+            limit_concurrency=int(os.getenv("LIMIT_CONCURRENCY", 64)),
+            timeout_keep_alive=30,
+        )
@@ -9,13 +9,65 @@ from docx.shared import Pt, RGBColor, Inches, Cm
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
+from docx.oxml.simpletypes import ST_HpsMeasure
+from lxml import etree
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass, field
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+import copy
 import io
+import os
+import sys
+import threading
+import numpy as np
+from table_kernels import any_near, gaps_exceed
 
 
-@dataclass
+# Documents with fewer pages are converted in-process; below this, starting
+# worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 16
+
+# Text extraction flags: the "dict" defaults minus image blocks, which would
+# copy every image's bytes into the result only for them to be skipped
+TEXT_EXTRACT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Qualified tag/attribute names for building runs directly (see AdvancedDOCXGenerator.add_text_line)
+W_R = qn('w:r')
+W_RFONTS = qn('w:rFonts')
+W_B = qn('w:b')
+W_I = qn('w:i')
+W_COLOR = qn('w:color')
+W_SZ = qn('w:sz')
+W_VAL = qn('w:val')
+W_ASCII = qn('w:ascii')
+W_HANSI = qn('w:hAnsi')
+
+
+# Fields read from each span of PyMuPDF's "dict" output, in one lookup
+_SPAN_FIELDS = itemgetter('text', 'bbox', 'font', 'size', 'flags', 'color')
+
+
+def _span_fields_or_defaults(span: Dict) -> Tuple:
+    """Same fields as _SPAN_FIELDS, with defaults for any that are missing"""
+    return (
+        span.get("text", ""),
+        span.get("bbox", (0, 0, 0, 0)),
+        span.get("font", "Arial"),
+        span.get("size", 12),
+        span.get("flags", 0),
+        span.get("color", 0)
+    )
+
+
+@lru_cache(maxsize=1024)
+def _rgb_tuple(color: int) -> Tuple[int, int, int]:
+    """(r, g, b) for a 0xRRGGBB color; cached so spans of one color share the tuple"""
+    return ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+
+
+@dataclass(slots=True)
 class TextSpan:
     """A span of text with consistent formatting"""
     text: str
@@ -30,7 +82,7 @@ class TextSpan:
     color: Tuple[int, int, int]
 
 
-@dataclass
+@dataclass(slots=True)
 class TextLine:
     """A line of text made up of spans"""
     spans: List[TextSpan] = field(default_factory=list)
@@ -48,8 +100,129 @@ class TextLine:
     def height(self) -> float:
         return max((s.height for s in self.spans), default=0)
 
+    def coalesce(self, max_gap: float = 1.0) -> 'TextLine':
+        """
+        Merge consecutive spans with identical formatting.
+
+        PyMuPDF often splits visually uniform text into several spans; each
+        would otherwise become its own DOCX run. Spans are only merged when
+        they touch (gap below max_gap points).
+
+        Returns:
+            A new TextLine (this one is left unchanged)
+        """
+        merged = TextLine(y=self.y)
+
+        for span in self.spans:
+            prev = merged.spans[-1] if merged.spans else None
+            if (
+                prev is not None
+                and span.x - (prev.x + prev.width) < max_gap
+                and span.font_name == prev.font_name
+                and span.font_size == prev.font_size
+                and span.is_bold == prev.is_bold
+                and span.is_italic == prev.is_italic
+                and span.color == prev.color
+            ):
+                merged.spans[-1] = TextSpan(
+                    text=prev.text + span.text,
+                    x=prev.x,
+                    y=prev.y,
+                    width=span.x + span.width - prev.x,
+                    height=max(prev.height, span.height),
+                    font_name=prev.font_name,
+                    font_size=prev.font_size,
+                    is_bold=prev.is_bold,
+                    is_italic=prev.is_italic,
+                    color=prev.color
+                )
+            else:
+                merged.spans.append(span)
+
+        return merged
+
 
 @dataclass
+class SpansArray:
+    """
+    Text spans of a page as parallel arrays (struct of arrays).
+
+    Spans are stored in reading order, grouped by line; line_ids maps each
+    span to its line. Table detection works on the arrays directly, and
+    TextLine/TextSpan objects are only built for lines that end up in the
+    document as text.
+
+    line_keys (each line's Y rounded to tenths, as an integer) and y_order
+    (spans sorted by their line's key, reading order within a key) are
+    computed once at extraction for table detection and table membership.
+    """
+    texts: List[str]
+    font_names: List[str]
+    xs: np.ndarray
+    ys: np.ndarray
+    widths: np.ndarray
+    heights: np.ndarray
+    font_sizes: np.ndarray
+    flags: np.ndarray       # PyMuPDF span flags (16 = bold, 2 = italic)
+    colors: np.ndarray      # sRGB as 0xRRGGBB
+    line_ids: np.ndarray
+    line_keys: np.ndarray
+    y_order: np.ndarray
+
+    @property
+    def line_count(self) -> int:
+        return int(self.line_ids[-1]) + 1 if len(self.line_ids) else 0
+
+    @property
+    def line_starts(self) -> np.ndarray:
+        """Index of the first span of each line, plus a final end index"""
+        return np.searchsorted(self.line_ids, np.arange(self.line_count + 1))
+
+    @property
+    def line_ys(self) -> np.ndarray:
+        """Y of each line (the Y of its first span)"""
+        return self.ys[self.line_starts[:-1]]
+
+    def text_line(self, line_id: int) -> TextLine:
+        """Build the TextLine for one line"""
+        start, end = np.searchsorted(self.line_ids, [line_id, line_id + 1])
+        return self._build_line(int(start), int(end))
+
+    def text_lines(self) -> List[TextLine]:
+        """Build TextLines for every line"""
+        starts = self.line_starts.tolist()
+        return [self._build_line(start, end) for start, end in zip(starts, starts[1:])]
+
+    def _build_line(self, start: int, end: int) -> TextLine:
+        text_line = TextLine()
+        xs = self.xs[start:end].tolist()
+        ys = self.ys[start:end].tolist()
+        widths = self.widths[start:end].tolist()
+        heights = self.heights[start:end].tolist()
+        font_sizes = self.font_sizes[start:end].tolist()
+        flags = self.flags[start:end].tolist()
+        colors = self.colors[start:end].tolist()
+
+        for i in range(end - start):
+            text_line.spans.append(TextSpan(
+                text=self.texts[start + i],
+                x=xs[i],
+                y=ys[i],
+                width=widths[i],
+                height=heights[i],
+                font_name=self.font_names[start + i],
+                font_size=font_sizes[i],
+                is_bold=bool(flags[i] & 16),
+                is_italic=bool(flags[i] & 2),
+                color=_rgb_tuple(colors[i])
+            ))
+
+        if text_line.spans:
+            text_line.y = text_line.spans[0].y
+        return text_line
+
+
+@dataclass(slots=True)
 class TableStructure:
     """Detected table structure"""
     headers: List[str]
@@ -59,96 +232,134 @@ class TableStructure:
     has_header_bg: bool = False
 
 
+class PDFImageRef:
+    """An image placed on a page; the image itself is only extracted on first access"""
+
+    def __init__(self, doc: fitz.Document, xref: int, bbox: fitz.Rect):
+        self.doc = doc
+        self.xref = xref
+        self.bbox = bbox
+        self._image: Optional[Dict] = None
+
+    def _extract(self) -> Dict:
+        if self._image is None:
+            self._image = self.doc.extract_image(self.xref)
+        return self._image
+
+    @property
+    def data(self) -> bytes:
+        return self._extract()['image']
+
+    @property
+    def ext(self) -> str:
+        return self._extract().get('ext', 'png')
+
+
 class AdvancedPDFExtractor:
     """Extract all PDF content with high fidelity"""
 
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, with_images: bool = True, with_drawings: bool = True):
+        """
+        Args:
+            pdf_path: PDF file to read
+            with_images: Whether extract_page_content lists the page's images
+            with_drawings: Whether extract_page_content lists the page's filled
+                shapes (parsing the page's vector graphics can dominate on
+                graphics-heavy PDFs)
+        """
         self.doc = fitz.open(pdf_path)
         self.pdf_path = pdf_path
+        self.with_images = with_images
+        self.with_drawings = with_drawings
 
     def extract_page_content(self, page_num: int) -> Dict:
         """Extract all content from a page"""
         page = self.doc[page_num]
 
         content = {
-            'text_lines': [],
+            'spans': None,
             'drawings': [],
             'images': [],
             'page_width': page.rect.width,
             'page_height': page.rect.height
         }
 
-        # Extract text with detailed formatting
-        text_dict = page.get_text("dict")
-
-        for block in text_dict.get("blocks", []):
-            if block.get("type") == 0:  # Text block
-                for line in block.get("lines", []):
-                    text_line = TextLine()
-
-                    for span in line.get("spans", []):
-                        text = span.get("text", "")
-                        if not text.strip():
-                            continue
-
-                        bbox = span.get("bbox", [0, 0, 0, 0])
-                        font = span.get("font", "Arial")
-                        size = span.get("size", 12)
-                        flags = span.get("flags", 0)
-                        color = span.get("color", 0)
-
-                        # Convert color
-                        if isinstance(color, int):
-                            r = (color >> 16) & 0xFF
-                            g = (color >> 8) & 0xFF
-                            b = color & 0xFF
-                        else:
-                            r = g = b = 0
-
-                        text_span = TextSpan(
-                            text=text,
-                            x=bbox[0],
-                            y=bbox[1],
-                            width=bbox[2] - bbox[0],
-                            height=bbox[3] - bbox[1],
-                            font_name=font,
-                            font_size=size,
-                            is_bold=bool(flags & 16),
-                            is_italic=bool(flags & 2),
-                            color=(r, g, b)
-                        )
-
-                        text_line.spans.append(text_span)
-
-                    if text_line.spans:
-                        text_line.y = text_line.spans[0].y
-                        content['text_lines'].append(text_line)
+        # Extract text with detailed formatting, collected column by column
+        texts, font_names = [], []
+        xs, ys, x1s, y1s, font_sizes, span_flags, colors, line_ids = [], [], [], [], [], [], [], []
+        line_count = 0
+
+        text_dict = page.get_text("dict", flags=TEXT_EXTRACT_FLAGS)
+
+        # Only text blocks hold spans (image blocks are already left out by the flags)
+        text_blocks = [block for block in text_dict.get("blocks", ()) if block.get("type") == 0]
+
+        for block in text_blocks:
+            for line in block["lines"]:
+                line_has_spans = False
+
+                for span in line["spans"]:
+                    try:
+                        text, (x0, y0, x1, y1), font, size, flags, color = _SPAN_FIELDS(span)
+                    except KeyError:
+                        text, (x0, y0, x1, y1), font, size, flags, color = _span_fields_or_defaults(span)
+                    if not text.strip():
+                        continue
+
+                    texts.append(text)
+                    # Pages use a handful of fonts; share one string per name
+                    font_names.append(sys.intern(font))
+                    xs.append(x0)
+                    ys.append(y0)
+                    x1s.append(x1)
+                    y1s.append(y1)
+                    font_sizes.append(size)
+                    span_flags.append(flags)
+                    # Convert color
+                    colors.append(color & 0xFFFFFF if isinstance(color, int) else 0)
+                    line_ids.append(line_count)
+                    line_has_spans = True
+
+                if line_has_spans:
+                    line_count += 1
+
+        # float64 keeps coordinates exactly as PyMuPDF reports them
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        line_ids = np.asarray(line_ids, dtype=np.int64)
+        line_starts = np.searchsorted(line_ids, np.arange(line_count))
+        line_keys = np.round(ys[line_starts] * 10).astype(np.int64)
+
+        content['spans'] = SpansArray(
+            texts=texts,
+            font_names=font_names,
+            xs=xs,
+            ys=ys,
+            widths=np.asarray(x1s, dtype=np.float64) - xs,
+            heights=np.asarray(y1s, dtype=np.float64) - ys,
+            font_sizes=np.asarray(font_sizes, dtype=np.float64),
+            flags=np.asarray(span_flags, dtype=np.int64),
+            colors=np.asarray(colors, dtype=np.int64),
+            line_ids=line_ids,
+            line_keys=line_keys,
+            y_order=np.argsort(line_keys[line_ids], kind='stable')
+        )
 
         # Extract drawings (for backgrounds and borders)
-        drawings = page.get_drawings()
-        for drawing in drawings:
-            if drawing.get('type') == 'f' and drawing.get('fill'):  # Filled shape
-                content['drawings'].append({
-                    'rect': drawing.get('rect'),
-                    'fill_color': drawing.get('fill'),
-                    'type': 'fill'
-                })
-
-        # Extract images
-        images = page.get_images()
-        for img in images:
-            try:
-                bbox = page.get_image_bbox(img)
-                if bbox:
-                    xref = img[0]
-                    img_data = self.doc.extract_image(xref)
-                    content['images'].append({
-                        'data': img_data['image'],
-                        'bbox': bbox,
-                        'ext': img_data.get('ext', 'png')
+        if self.with_drawings:
+            for drawing in page.get_drawings():
+                if drawing.get('type') == 'f' and drawing.get('fill'):  # Filled shape
+                    content['drawings'].append({
+                        'rect': drawing.get('rect'),
+                        'fill_color': drawing.get('fill'),
+                        'type': 'fill'
                     })
-            except:
-                pass
+
+        # Record where images are placed; their data is only extracted if used
+        if self.with_images:
+            for info in page.get_image_info(xrefs=True):
+                if info['xref']:  # inline images have no xref to extract
+                    content['images'].append(PDFImageRef(self.doc, info['xref'], fitz.Rect(info['bbox'])))
 
         return content
 
@@ -159,28 +370,31 @@ class AdvancedPDFExtractor:
 class TableDetector:
     """Detect tables in PDF content"""
 
-    def detect_tables(self, text_lines: List[TextLine]) -> List[TableStructure]:
-        """Detect table structures in text lines"""
+    def detect_tables(self, spans: SpansArray) -> List[TableStructure]:
+        """Detect table structures in a page's text spans"""
         tables = []
 
-        # Group lines by Y coordinate with finer precision
-        y_groups = defaultdict(list)
-        for line in text_lines:
-            y_key = round(line.y, 1)  # Group by rounded Y (1 decimal place)
-            y_groups[y_key].append(line)
+        # A table needs a header of at least 3 bold spans and a row below it,
+        # which rules out most prose pages before any grouping is done
+        if len(spans.xs) < 4 or np.count_nonzero(spans.flags & 16) < 3:
+            return tables
+
+        # Group lines by Y coordinate with finer precision (rounded to 1 decimal
+        # place, as integer tenths), using the order computed at extraction
+        span_order = spans.y_order
+        sorted_keys = spans.line_keys[spans.line_ids[span_order]]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
 
-        # Look for table patterns
-        sorted_ys = sorted(y_groups.keys())
+        # Look for table patterns, one group of spans per rounded Y
+        sorted_ys = (sorted_keys[np.r_[0, bounds]] / 10).tolist()
+        y_groups = np.split(span_order, bounds)
 
         i = 0
         while i < len(sorted_ys):
-            y = sorted_ys[i]
-            current_lines = y_groups[y]
-
             # Check if this looks like a table header row
             # (multiple columns with bold text)
-            if self._is_table_header(current_lines):
-                table = self._extract_table(sorted_ys[i:], y_groups)
+            if self._is_table_header(spans, y_groups[i]):
+                table = self._extract_table(spans, sorted_ys[i:], y_groups[i:])
                 if table:
                     tables.append(table)
                     # Skip the rows we've processed
@@ -191,67 +405,40 @@ class TableDetector:
 
         return tables
 
-    def _is_table_header(self, lines: List[TextLine]) -> bool:
-        """Check if lines look like a table header"""
+    def _is_table_header(self, spans: SpansArray, span_idx: np.ndarray) -> bool:
+        """Check if spans at one Y look like a table header"""
         # Can be either:
         # 1. Single line with multiple bold spans (multiple columns)
         # 2. Multiple lines at same Y (PyMuPDF sometimes splits columns into separate "lines")
 
-        if not lines:
-            return False
-
-        # Check if all lines are bold
-        all_spans = []
-        for line in lines:
-            all_spans.extend(line.spans)
-
-        if not all_spans:
+        # Must have at least 3 columns (more strict - typical for tables)
+        if len(span_idx) < 3:
             return False
 
-        all_bold = all(span.is_bold for span in all_spans)
-
-        # Must have at least 3 columns (more strict - typical for tables)
-        if len(all_spans) < 3:
+        # Check if all spans are bold
+        if not np.all(spans.flags[span_idx] & 16):
             return False
 
         # Check for horizontal spacing (columns should be separated)
-        if len(all_spans) >= 2:
-            # Sort by X position
-            sorted_spans = sorted(all_spans, key=lambda s: s.x)
+        by_x = span_idx[np.argsort(spans.xs[span_idx], kind='stable')]
 
-            gaps = []
-            for i in range(len(sorted_spans) - 1):
-                gap = sorted_spans[i+1].x - (sorted_spans[i].x + sorted_spans[i].width)
-                gaps.append(gap)
+        # Significant gaps suggest columns
+        return gaps_exceed(spans.xs[by_x], spans.widths[by_x], 5.0)
 
-            # Significant gaps suggest columns
-            has_gaps = any(gap > 5 for gap in gaps)
-
-            return all_bold and has_gaps
-
-        return all_bold
-
-    def _extract_table(self, y_keys: List[float], y_groups: Dict) -> Optional[TableStructure]:
+    def _extract_table(self, spans: SpansArray, y_keys: List[float], y_groups: List[np.ndarray]) -> Optional[TableStructure]:
         """Extract table structure starting from header"""
         if not y_keys:
             return None
 
-        # First row is header - merge all lines at same Y
+        # First row is header - all spans at the same Y, sorted by X position
         header_y = y_keys[0]
-        header_lines = y_groups[header_y]
-
-        # Collect all spans from header lines and sort by X position
-        all_header_spans = []
-        for line in header_lines:
-            all_header_spans.extend(line.spans)
+        header_idx = y_groups[0][np.argsort(spans.xs[y_groups[0]], kind='stable')]
 
-        all_header_spans.sort(key=lambda s: s.x)
-
-        headers = [span.text.strip() for span in all_header_spans]
+        headers = [spans.texts[idx].strip() for idx in header_idx.tolist()]
         num_cols = len(headers)
 
         # Get column X positions from header
-        col_positions = [span.x for span in all_header_spans]
+        col_positions = spans.xs[header_idx]
 
         rows = []
         table_y_start = header_y
@@ -260,62 +447,47 @@ class TableDetector:
         # Group nearby Y values as single rows (tolerance of 2 pixels)
         row_groups = []
         current_row_y = None
-        current_row_lines = []
-
-        for y in y_keys[1:]:
-            lines = y_groups[y]
-            if not lines:
-                continue
+        current_row_groups = []
 
+        for y, group in zip(y_keys[1:], y_groups[1:]):
             # Check if this Y is close to current row Y
             if current_row_y is None or abs(y - current_row_y) <= 2.0:
                 if current_row_y is None:
                     current_row_y = y
-                current_row_lines.extend(lines)
+                current_row_groups.append(group)
             else:
                 # Process previous row
-                if current_row_lines:
-                    row_groups.append((current_row_y, current_row_lines))
+                row_groups.append((current_row_y, np.concatenate(current_row_groups)))
                 current_row_y = y
-                current_row_lines = list(lines)
+                current_row_groups = [group]
 
             # Stop if we've gone too far
             if y - header_y > 200:
                 break
 
         # Don't forget last row
-        if current_row_lines:
-            row_groups.append((current_row_y, current_row_lines))
+        if current_row_groups:
+            row_groups.append((current_row_y, np.concatenate(current_row_groups)))
 
         # Extract rows and merge multi-line cells
-        for row_y, row_lines in row_groups:
-            # Merge all lines in the row
-            merged_line = TextLine()
-            for line in row_lines:
-                merged_line.spans.extend(line.spans)
-            merged_line.y = row_y
-
+        for row_y, row_idx in row_groups:
             # Check if this is part of the table
-            if not self._is_table_row(merged_line, col_positions, num_cols):
+            if not self._is_table_row(spans, row_idx, col_positions):
                 break
 
             # Extract cell values
-            row = self._extract_row_cells(merged_line, col_positions, num_cols)
+            row = self._extract_row_cells(spans, row_idx, col_positions, num_cols)
 
             # Check if this is a continuation of the previous row
             # (has data only in one column, particularly the description column)
             is_continuation = False
             if rows and len(row) == num_cols:
-                non_empty_count = sum(1 for cell in row if cell.strip())
-                if non_empty_count == 1:
+                non_empty = [i for i, cell in enumerate(row) if cell.strip()]
+                if len(non_empty) == 1:
                     # This might be a multi-line cell continuation
                     # Merge with previous row
-                    for i in range(num_cols):
-                        if row[i].strip():
-                            if rows[-1][i]:
-                                rows[-1][i] += ' ' + row[i]
-                            else:
-                                rows[-1][i] = row[i]
+                    i = non_empty[0]
+                    rows[-1][i] = rows[-1][i] + ' ' + row[i] if rows[-1][i] else row[i]
                     is_continuation = True
 
             if not is_continuation:
@@ -333,73 +505,121 @@ class TableDetector:
 
         return None
 
-    def _is_table_row(self, line: TextLine, col_positions: List[float], num_cols: int) -> bool:
-        """Check if line is a table row"""
-        # Simple heuristic: line should have text near column positions
-        if not line.spans:
+    def _is_table_row(self, spans: SpansArray, span_idx: np.ndarray, col_positions: np.ndarray) -> bool:
+        """Check if the spans of a row line up with the table columns"""
+        # Simple heuristic: row should have text near column positions
+        if not len(span_idx):
             return False
 
         # Check if any span aligns with column positions (within tolerance)
         tolerance = 30
-        for span in line.spans:
-            for col_x in col_positions:
-                if abs(span.x - col_x) < tolerance:
-                    return True
-
-        return False
+        return any_near(spans.xs[span_idx], col_positions, float(tolerance))
 
-    def _extract_row_cells(self, line: TextLine, col_positions: List[float], num_cols: int) -> List[str]:
+    def _extract_row_cells(self, spans: SpansArray, span_idx: np.ndarray, col_positions: np.ndarray, num_cols: int) -> List[str]:
         """Extract cell values from a row"""
         cells = [''] * num_cols
 
-        # Assign each span to the nearest column
-        for span in line.spans:
-            # Find nearest column
-            min_dist = float('inf')
-            col_idx = 0
-            for i, col_x in enumerate(col_positions):
-                dist = abs(span.x - col_x)
-                if dist < min_dist:
-                    min_dist = dist
-                    col_idx = i
+        # Assign each span to the nearest column (first one on ties)
+        nearest_cols = self._column_distances(spans.xs[span_idx], col_positions).argmin(axis=1)
 
+        for col_idx, idx in zip(nearest_cols.tolist(), span_idx.tolist()):
             # Add to cell (with space if needed)
             if cells[col_idx]:
                 cells[col_idx] += ' '
-            cells[col_idx] += span.text.strip()
+            cells[col_idx] += spans.texts[idx].strip()
 
         return cells
 
+    def _column_distances(self, xs: np.ndarray, col_positions: np.ndarray) -> np.ndarray:
+        """Distance from each span X to each column X, as a (spans, columns) array"""
+        return np.abs(xs[:, None] - col_positions[None, :])
+
+
+# Extractor of the current worker process (MuPDF documents can't be pickled,
+# so each worker opens the PDF once)
+_worker_extractor: Optional['AdvancedPDFExtractor'] = None
+
+
+def _init_page_worker(pdf_path: str):
+    global _worker_extractor
+    _worker_extractor = AdvancedPDFExtractor(pdf_path, with_images=False, with_drawings=False)
+
+
+def _process_page(page_num: int) -> Tuple[SpansArray, List[TableStructure]]:
+    """Extract a page's text and detect its tables, in a worker process"""
+    spans = _worker_extractor.extract_page_content(page_num)['spans']
+    return spans, TableDetector().detect_tables(spans)
+
+
+def _set_narrow_margins(doc):
+    """Set narrow margins for better layout"""
+    for section in doc.sections:
+        section.top_margin = Cm(1.27)
+        section.bottom_margin = Cm(1.27)
+        section.left_margin = Cm(1.27)
+        section.right_margin = Cm(1.27)
+
+
+# Blank document every conversion starts from. Copying it is cheaper than
+# loading python-docx's default template and setting it up each time.
+_DOCUMENT_TEMPLATE = Document()
+_set_narrow_margins(_DOCUMENT_TEMPLATE)
+
 
 class AdvancedDOCXGenerator:
     """Generate high-quality DOCX with tables and formatting"""
 
     def __init__(self):
-        self.doc = Document()
-        self._set_narrow_margins()
-
-    def _set_narrow_margins(self):
-        """Set narrow margins for better layout"""
-        sections = self.doc.sections
-        for section in sections:
-            section.top_margin = Cm(1.27)
-            section.bottom_margin = Cm(1.27)
-            section.left_margin = Cm(1.27)
-            section.right_margin = Cm(1.27)
+        self.doc = copy.deepcopy(_DOCUMENT_TEMPLATE)
+        # Body content goes before the final section properties
+        self._body_end = self.doc.element.body.sectPr
+        # w:rPr elements already built, by (font, size, bold, italic, color)
+        self._rpr_cache: Dict[tuple, etree._Element] = {}
 
     def add_text_line(self, line: TextLine):
         """Add a text line with proper formatting"""
-        para = self.doc.add_paragraph()
-
-        for span in line.spans:
-            run = para.add_run(span.text)
-            run.font.size = Pt(span.font_size)
-            run.font.name = span.font_name
-            run.bold = span.is_bold
-            run.italic = span.is_italic
+        # Build the paragraph XML directly: python-docx's paragraph and run API
+        # costs several tree searches and property setters per span, and
+        # add_paragraph scans the whole body to find where to insert.
+        # The markup is the same as add_run() + font setters would produce.
+        para = OxmlElement('w:p')
+
+        for span in line.coalesce().spans:
+            run = etree.SubElement(para, W_R)
+            run.append(self._get_rpr(span))
+
+            # Handles tabs/line breaks and xml:space like Run.text
+            run.text = span.text
+
+        self._body_end.addprevious(para)
+
+    def _get_rpr(self, span: TextSpan):
+        """
+        Run properties (w:rPr) for a span's formatting.
+
+        Documents use few distinct formats, so each is built once and copied
+        for every further run (a copy is several times cheaper than building).
+        """
+        key = (span.font_name, span.font_size, span.is_bold, span.is_italic, span.color)
+        rpr = self._rpr_cache.get(key)
+
+        if rpr is None:
+            rpr = OxmlElement('w:rPr')
+            etree.SubElement(rpr, W_RFONTS, {W_ASCII: span.font_name, W_HANSI: span.font_name})
+            bold = etree.SubElement(rpr, W_B)
+            if not span.is_bold:
+                bold.set(W_VAL, '0')
+            italic = etree.SubElement(rpr, W_I)
+            if not span.is_italic:
+                italic.set(W_VAL, '0')
 
             if span.color != (0, 0, 0):
-                run.font.color.rgb = RGBColor(*span.color)
+                etree.SubElement(rpr, W_COLOR, {W_VAL: str(RGBColor(*span.color))})
+
+            etree.SubElement(rpr, W_SZ, {W_VAL: ST_HpsMeasure.convert_to_xml(Pt(span.font_size))})
+            self._rpr_cache[key] = rpr
+
+        return copy.deepcopy(rpr)
 
     def add_table(self, table_structure: TableStructure):
         """Add a table with proper formatting"""
@@ -426,7 +646,21 @@ class AdvancedDOCXGenerator:
                     cells[col_idx].text = cell_text
 
     def save(self, output_path: str):
-        self.doc.save(output_path)
+        """
+        Write the DOCX next to output_path, then move it into place.
+
+        Readers of output_path never see a partially written file, and a
+        failed save leaves any previous file there untouched.
+        """
+        # A plain sibling file (rather than tempfile's 0600 files) keeps the
+        # usual permissions for the output
+        temp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.doc.save(temp_path)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
 
 
 class AdvancedPDF2DOCXConverter:
@@ -434,13 +668,54 @@ class AdvancedPDF2DOCXConverter:
 
     def __init__(self, pdf_path: str):
         self.pdf_path = pdf_path
-        self.extractor = AdvancedPDFExtractor(pdf_path)
+        # Images and drawings aren't written to the DOCX yet, so don't look for them
+        self.extractor = AdvancedPDFExtractor(pdf_path, with_images=False, with_drawings=False)
         self.table_detector = TableDetector()
         self.generator = AdvancedDOCXGenerator()
 
-    def convert(self, output_path: str, verbose: bool = True):
-        """Convert PDF to DOCX with high quality"""
+    def _find_line_tables(self, line_ys: np.ndarray, tables: List[TableStructure]) -> np.ndarray:
+        """
+        Index of the first table whose Y range contains each line, or -1.
+
+        Tables come out of TableDetector in increasing y_start order. The first
+        table that can contain y is the first whose running maximum y_end
+        reaches y; it contains y if its y_start is not past y.
+        """
+        if not tables:
+            return np.full(len(line_ys), -1, dtype=np.int64)
+
+        starts = np.array([t.y_start for t in tables])
+        max_ends = np.maximum.accumulate([t.y_end for t in tables])
+
+        last_started = np.searchsorted(starts, line_ys, side='right') - 1
+        first_reaching = np.searchsorted(max_ends, line_ys, side='left')
+        return np.where(first_reaching <= last_started, first_reaching, -1)
+
+    def _iter_pages(self, page_count: int, workers: int):
+        """Yield (spans, tables) for each page in order, using worker processes for long documents"""
+        if workers > 1 and page_count >= PARALLEL_MIN_PAGES:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_page_worker,
+                initargs=(self.pdf_path,)
+            ) as executor:
+                chunksize = max(1, page_count // (4 * workers))
+                yield from executor.map(_process_page, range(page_count), chunksize=chunksize)
+        else:
+            for page_num in range(page_count):
+                spans = self.extractor.extract_page_content(page_num)['spans']
+                yield spans, self.table_detector.detect_tables(spans)
+
+    def convert(self, output_path: str, verbose: bool = True, workers: Optional[int] = None):
+        """
+        Convert PDF to DOCX with high quality
+
+        Pages are extracted and scanned for tables in parallel (up to `workers`
+        processes, default one per CPU); the DOCX is assembled here in page order.
+        """
         page_count = self.extractor.doc.page_count
+        if workers is None:
+            workers = os.cpu_count() or 1
 
         if verbose:
             print(f"\n{'='*60}")
@@ -448,42 +723,31 @@ class AdvancedPDF2DOCXConverter:
             print(f"{'='*60}")
             print(f"Converting {page_count} page(s)...\n")
 
-        for page_num in range(page_count):
+        for page_num, (spans, tables) in enumerate(self._iter_pages(page_count, workers)):
             if verbose:
                 print(f"Page {page_num + 1}/{page_count}...")
 
-            content = self.extractor.extract_page_content(page_num)
-            text_lines = content['text_lines']
-
-            # Detect tables
-            tables = self.table_detector.detect_tables(text_lines)
-
             if verbose and tables:
                 print(f"  Found {len(tables)} table(s)")
 
-            # Track which lines are part of tables
-            table_y_ranges = [(t.y_start, t.y_end) for t in tables]
+            # Track which lines are part of tables. Table ranges are in rounded
+            # Y (see TableDetector), so lines are matched on their rounded Y too.
+            line_ys = spans.line_keys / 10
+            line_tables = self._find_line_tables(line_ys, tables)
             tables_added = set()
 
             # Process content
-            for line in text_lines:
-                # Check if this line is part of a table
-                in_table_idx = None
-                for idx, (y_start, y_end) in enumerate(table_y_ranges):
-                    if y_start <= line.y <= y_end:
-                        in_table_idx = idx
-                        break
-
-                if in_table_idx is not None:
+            for line_id, in_table_idx in enumerate(line_tables.tolist()):
+                if in_table_idx >= 0:
                     # Add table if we haven't yet and this is near the start
                     if in_table_idx not in tables_added:
-                        if abs(line.y - tables[in_table_idx].y_start) <= 1.0:
+                        if abs(line_ys[line_id] - tables[in_table_idx].y_start) <= 1.0:
                             self.generator.add_table(tables[in_table_idx])
                             tables_added.add(in_table_idx)
                     # Skip the line (it's part of the table)
                 else:
                     # Regular text line
-                    self.generator.add_text_line(line)
+                    self.generator.add_text_line(spans.text_line(line_id))
 
             # Page break
             if page_num < page_count - 1:
@@ -500,7 +764,7 @@ class AdvancedPDF2DOCXConverter:
         self.extractor.close()
 
 
-def convert_pdf_to_docx(pdf_path: str, output_path: str = None, verbose: bool = True) -> str:
+def convert_pdf_to_docx(pdf_path: str, output_path: str = None, verbose: bool = True, workers: Optional[int] = None) -> str:
     """
     Convert PDF to DOCX with advanced features
 
@@ -509,11 +773,12 @@ def convert_pdf_to_docx(pdf_path: str, output_path: str = None, verbose: bool =
     - Preserves text formatting (bold, italic, colors)
     - Maintains font sizes
     - Proper spacing and layout
+    - Long documents are extracted in parallel (`workers` processes, default one per CPU)
     """
     if output_path is None:
         output_path = pdf_path.replace('.pdf', '.docx')
 
     converter = AdvancedPDF2DOCXConverter(pdf_path)
-    converter.convert(output_path, verbose=verbose)
+    converter.convert(output_path, verbose=verbose, workers=workers)
 
     return output_path
@@ -9,14 +9,48 @@ from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
+from docx.oxml.simpletypes import ST_HpsMeasure
+from lxml import etree
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
 from collections import defaultdict
+from operator import attrgetter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import copy
 import io
-from PIL import Image
-
-
-@dataclass
+import os
+import numpy as np
+
+
+# Documents with fewer pages are converted in-process; below this, starting
+# worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 16
+
+# Text extraction flags: the "dict" defaults minus image blocks, which would
+# copy every image's bytes into the result only for them to be skipped
+# (images are read separately by extract_images)
+TEXT_EXTRACT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Extracted images kept per PDFExtractor, for images repeated across pages
+IMAGE_CACHE_SIZE = 32
+
+# Qualified tag/attribute names for building paragraphs directly (see DOCXGenerator.add_text_block)
+W_R = qn('w:r')
+W_RPR = qn('w:rPr')
+W_RFONTS = qn('w:rFonts')
+W_B = qn('w:b')
+W_I = qn('w:i')
+W_COLOR = qn('w:color')
+W_SZ = qn('w:sz')
+W_VAL = qn('w:val')
+W_ASCII = qn('w:ascii')
+W_HANSI = qn('w:hAnsi')
+W_BR = qn('w:br')
+W_TYPE = qn('w:type')
+
+
+@dataclass(slots=True)
 class TextBlock:
     """Represents a block of text with formatting and position"""
     text: str
@@ -27,7 +61,7 @@ class TextBlock:
     font_name: str
     font_size: float
     font_flags: int  # bold, italic, etc.
-    color: Tuple[int, int, int]
+    color: int  # sRGB as 0xRRGGBB
     page_num: int
 
     @property
@@ -47,7 +81,7 @@ class TextBlock:
         return self.x + self.width
 
 
-@dataclass
+@dataclass(slots=True)
 class ImageBlock:
     """Represents an image with position"""
     image_data: bytes
@@ -58,7 +92,7 @@ class ImageBlock:
     page_num: int
 
 
-@dataclass
+@dataclass(slots=True)
 class TableCell:
     """Represents a table cell"""
     text: str
@@ -81,26 +115,31 @@ class LayoutAnalyzer:
             return []
 
         # Sort by Y position, then X position
-        sorted_blocks = sorted(blocks, key=lambda b: (b.y, b.x))
+        sorted_blocks = sorted(blocks, key=attrgetter('y', 'x'))
 
+        tolerance_y = self.tolerance_y
         lines = []
-        current_line = [sorted_blocks[0]]
+        current_line = []
+        line_y = sorted_blocks[0].y
 
-        for block in sorted_blocks[1:]:
-            # Check if block is on the same line (similar Y coordinate)
-            if abs(block.y - current_line[0].y) <= self.tolerance_y:
+        for block in sorted_blocks:
+            # Check if block is on the same line (similar Y coordinate as the line's first block)
+            if abs(block.y - line_y) <= tolerance_y:
                 current_line.append(block)
             else:
                 # Start new line
                 lines.append(current_line)
                 current_line = [block]
+                line_y = block.y
 
-        if current_line:
-            lines.append(current_line)
+        lines.append(current_line)
 
-        # Sort blocks within each line by X position
+        # Sort blocks within each line by X position (only needed if Ys differ
+        # within the line; Timsort is linear on the already sorted runs)
+        by_x = attrgetter('x')
         for line in lines:
-            line.sort(key=lambda b: b.x)
+            if len(line) > 1:
+                line.sort(key=by_x)
 
         return lines
 
@@ -112,31 +151,30 @@ class LayoutAnalyzer:
         if len(line) == 1:
             return line[0]
 
-        # Merge text with spaces
-        texts = []
-        prev_block = None
-        for block in line:
-            if prev_block:
-                # Calculate gap between blocks
-                gap = block.x - prev_block.right
-                # Add space if there's a gap
-                if gap > 2:
-                    texts.append(' ')
-            texts.append(block.text)
-            prev_block = block
-
-        merged_text = ''.join(texts)
-
         # Use properties from first block
         first = line[0]
         last = line[-1]
 
+        # Merge text with spaces (block edges are read directly rather than
+        # through the right property)
+        texts = [first.text]
+        prev_right = first.x + first.width
+        height = first.height
+        for block in line[1:]:
+            # Add space if there's a gap between blocks
+            if block.x - prev_right > 2:
+                texts.append(' ')
+            texts.append(block.text)
+            prev_right = block.x + block.width
+            if block.height > height:
+                height = block.height
+
         return TextBlock(
-            text=merged_text,
+            text=''.join(texts),
             x=first.x,
             y=first.y,
-            width=last.right - first.x,
-            height=max(b.height for b in line),
+            width=last.x + last.width - first.x,
+            height=height,
             font_name=first.font_name,
             font_size=first.font_size,
             font_flags=first.font_flags,
@@ -156,14 +194,23 @@ class LayoutAnalyzer:
         # TODO: Implement table detection algorithm
         return None
 
-    def classify_heading(self, block: TextBlock, avg_font_size: float) -> int:
-        """Classify text block as heading level (0 = normal text, 1-6 = heading)"""
+    def heading_thresholds(self, avg_font_size: float) -> Tuple[float, float, float]:
+        """Minimum font sizes for heading levels 1, 2 and 3, given a page's average font size"""
         # Simple heuristic: larger font = heading
-        if block.font_size >= avg_font_size * 1.5:
+        return avg_font_size * 1.5, avg_font_size * 1.3, avg_font_size * 1.15
+
+    def classify_heading(self, block: TextBlock, h1_size: float, h2_size: float, h3_size: float) -> int:
+        """
+        Classify text block as heading level (0 = normal text, 1-6 = heading)
+
+        The sizes come from heading_thresholds(), computed once per page.
+        """
+        size = block.font_size
+        if size >= h1_size:
             return 1  # Heading 1
-        elif block.font_size >= avg_font_size * 1.3:
+        elif size >= h2_size:
             return 2  # Heading 2
-        elif block.font_size >= avg_font_size * 1.15:
+        elif size >= h3_size:
             return 3  # Heading 3
         return 0  # Normal text
 
@@ -174,66 +221,82 @@ class PDFExtractor:
     def __init__(self, pdf_path: str):
         self.doc = fitz.open(pdf_path)
         self.pdf_path = pdf_path
+        # doc.extract_image(xref), cached by xref: logos, headers and
+        # backgrounds are often the same image object on every page
+        self._extract_image = lru_cache(maxsize=IMAGE_CACHE_SIZE)(self.doc.extract_image)
 
     def extract_text_blocks(self, page_num: int) -> List[TextBlock]:
         """Extract text blocks from a page with formatting info"""
         page = self.doc[page_num]
-        blocks = []
 
         # Get text with formatting details
-        text_dict = page.get_text("dict")
+        text_dict = page.get_text("dict", flags=TEXT_EXTRACT_FLAGS)
+
+        # Collect the non-empty spans column by column, then build the
+        # TextBlocks in one pass
+        texts, fonts, sizes, flags, colors = [], [], [], [], []
+        x0s, y0s, x1s, y1s = [], [], [], []
 
         for block in text_dict.get("blocks", []):
             if block.get("type") == 0:  # Text block
                 for line in block.get("lines", []):
                     for span in line.get("spans", []):
-                        text = span.get("text", "").strip()
-                        if not text:
+                        get = span.get
+                        # isspace() is False for "" as well; strip only the survivors
+                        text = get("text", "")
+                        if not text or text.isspace():
                             continue
 
-                        bbox = span.get("bbox", [0, 0, 0, 0])
-                        font = span.get("font", "Arial")
-                        size = span.get("size", 12)
-                        flags = span.get("flags", 0)
-                        color = span.get("color", 0)
-
-                        # Convert color from integer to RGB
-                        if isinstance(color, int):
-                            r = (color >> 16) & 0xFF
-                            g = (color >> 8) & 0xFF
-                            b = color & 0xFF
-                        else:
-                            r = g = b = 0
-
-                        blocks.append(TextBlock(
-                            text=text,
-                            x=bbox[0],
-                            y=bbox[1],
-                            width=bbox[2] - bbox[0],
-                            height=bbox[3] - bbox[1],
-                            font_name=font,
-                            font_size=size,
-                            font_flags=flags,
-                            color=(r, g, b),
-                            page_num=page_num
-                        ))
-
-        return blocks
+                        x0, y0, x1, y1 = get("bbox", (0, 0, 0, 0))
+                        texts.append(text.strip())
+                        x0s.append(x0)
+                        y0s.append(y0)
+                        x1s.append(x1)
+                        y1s.append(y1)
+                        fonts.append(get("font", "Arial"))
+                        sizes.append(get("size", 12))
+                        flags.append(get("flags", 0))
+                        colors.append(get("color", 0))
+
+        # The columns hold everything still needed; free the page's full text
+        # dict (every span, line and block dict) before building the blocks
+        del text_dict
+
+        if not texts:
+            return []
+
+        xs = np.asarray(x0s, dtype=np.float64)
+        ys = np.asarray(y0s, dtype=np.float64)
+        widths = (np.asarray(x1s, dtype=np.float64) - xs).tolist()
+        heights = (np.asarray(y1s, dtype=np.float64) - ys).tolist()
+
+        # Keep colors as packed 0xRRGGBB integers (PyMuPDF always reports sRGB ints)
+        colors = (np.asarray(colors, dtype=np.int64) & 0xFFFFFF).tolist()
+
+        return [
+            TextBlock(text, x, y, width, height, font, size, span_flags, color, page_num)
+            for text, x, y, width, height, font, size, span_flags, color
+            in zip(texts, x0s, y0s, widths, heights, fonts, sizes, flags, colors)
+        ]
 
     def extract_images(self, page_num: int) -> List[ImageBlock]:
         """Extract images from a page"""
         page = self.doc[page_num]
         images = []
 
-        image_list = page.get_images()
+        # Every image placement on the page with its bbox, from a single pass
+        # over the page's content
+        image_infos = page.get_image_info(xrefs=True)
 
-        for img_index, img in enumerate(image_list):
-            xref = img[0]
-            bbox = page.get_image_bbox(img)
+        for img_index, info in enumerate(image_infos):
+            xref = info['xref']
+            if not xref:  # inline images have no xref to extract
+                continue
+            bbox = fitz.Rect(info['bbox'])
 
-            if bbox and bbox.is_valid:
+            if bbox.is_valid and not bbox.is_empty:
                 try:
-                    base_image = self.doc.extract_image(xref)
+                    base_image = self._extract_image(xref)
                     image_data = base_image["image"]
 
                     images.append(ImageBlock(
@@ -255,15 +318,84 @@ class PDFExtractor:
 
     def close(self):
         """Close the PDF document"""
+        self._extract_image.cache_clear()
         self.doc.close()
 
 
+# Extractor and analyzer of the current worker process (MuPDF documents can't
+# be pickled, so each worker opens the PDF once)
+_worker_extractor: Optional['PDFExtractor'] = None
+_worker_analyzer: Optional[LayoutAnalyzer] = None
+
+
+def _init_page_worker(pdf_path: str, tolerance_y: float, tolerance_x: float):
+    global _worker_extractor, _worker_analyzer
+    _worker_extractor = PDFExtractor(pdf_path)
+    _worker_analyzer = LayoutAnalyzer(tolerance_y, tolerance_x)
+
+
+def _process_page(page_num: int) -> Tuple[List[Tuple[TextBlock, int]], List[ImageBlock], int]:
+    """Extract and lay out one page, in a worker process"""
+    return _analyze_page(_worker_extractor, _worker_analyzer, page_num)
+
+
+def _analyze_page(
+    extractor: 'PDFExtractor',
+    analyzer: LayoutAnalyzer,
+    page_num: int
+) -> Tuple[List[Tuple[TextBlock, int]], List[ImageBlock], int]:
+    """
+    Extract a page's content and group it for the DOCX.
+
+    Returns:
+        (merged line blocks with their heading levels, images, number of text blocks extracted)
+    """
+    # Extract text blocks
+    text_blocks = extractor.extract_text_blocks(page_num)
+
+    # Extract images
+    images = extractor.extract_images(page_num)
+
+    # Calculate average font size for heading detection
+    avg_font_size = sum([b.font_size for b in text_blocks]) / len(text_blocks) if text_blocks else 12
+    h1_size, h2_size, h3_size = analyzer.heading_thresholds(avg_font_size)
+
+    # Group text blocks into lines
+    lines = []
+    for line in analyzer.group_into_lines(text_blocks):
+        merged_block = analyzer.merge_line_blocks(line)
+        if merged_block:
+            # Classify as heading or normal text
+            lines.append((merged_block, analyzer.classify_heading(merged_block, h1_size, h2_size, h3_size)))
+
+    return lines, images, len(text_blocks)
+
+
+@lru_cache(maxsize=256)
+def _font_size_value(font_size: float) -> str:
+    """w:sz value (half-points) for a font size in points"""
+    return ST_HpsMeasure.convert_to_xml(Pt(font_size))
+
+
+@lru_cache(maxsize=256)
+def _color_value(color: int) -> str:
+    """w:color value ("RRGGBB") for a 0xRRGGBB color"""
+    return str(RGBColor((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+
+
 class DOCXGenerator:
     """Generates DOCX from extracted content"""
 
     def __init__(self):
         self.doc = Document()
         self._setup_styles()
+        # Body content goes before the final section properties
+        self._body_end = self.doc.element.body.sectPr
+
+        # Page-break paragraph, copied for each break (same markup as Document.add_page_break)
+        self._page_break_xml = OxmlElement('w:p')
+        run = etree.SubElement(self._page_break_xml, W_R)
+        etree.SubElement(run, W_BR, {W_TYPE: 'page'})
 
     def _setup_styles(self):
         """Setup custom styles for better formatting"""
@@ -278,29 +410,43 @@ class DOCXGenerator:
             # Add as heading
             para = self.doc.add_heading(block.text, level=heading_level)
         else:
-            # Add as paragraph
-            para = self.doc.add_paragraph()
-            run = para.add_run(block.text)
+            # Add as paragraph. The XML is built directly: python-docx's paragraph
+            # and run API costs several tree searches and property setters per
+            # block, and add_paragraph scans the whole body to find where to
+            # insert. The markup is the same as add_run() + font setters produce.
+            para = OxmlElement('w:p')
+            run = etree.SubElement(para, W_R)
+            rpr = etree.SubElement(run, W_RPR)
 
             # Apply formatting
-            run.font.size = Pt(block.font_size)
-            run.font.name = block.font_name
-            run.bold = block.is_bold
-            run.italic = block.is_italic
+            etree.SubElement(rpr, W_RFONTS, {W_ASCII: block.font_name, W_HANSI: block.font_name})
+            bold = etree.SubElement(rpr, W_B)
+            if not block.is_bold:
+                bold.set(W_VAL, '0')
+            italic = etree.SubElement(rpr, W_I)
+            if not block.is_italic:
+                italic.set(W_VAL, '0')
 
             # Apply color if not black
-            if block.color != (0, 0, 0):
-                run.font.color.rgb = RGBColor(*block.color)
+            if block.color:
+                etree.SubElement(rpr, W_COLOR, {W_VAL: _color_value(block.color)})
+
+            etree.SubElement(rpr, W_SZ, {W_VAL: _font_size_value(block.font_size)})
+
+            # Handles tabs/line breaks and xml:space like Run.text
+            run.text = block.text
+
+            self._body_end.addprevious(para)
+
+    def add_page_break(self):
+        """Add a page break to the document"""
+        self._body_end.addprevious(copy.deepcopy(self._page_break_xml))
 
     def add_image(self, image_block: ImageBlock, max_width: float = 6.0):
         """Add an image to the document"""
         try:
-            # Load image to get dimensions
-            img = Image.open(io.BytesIO(image_block.image_data))
-            width, height = img.size
-
-            # Calculate appropriate size (maintain aspect ratio)
-            aspect_ratio = height / width
+            # Size from the image's placement on the page; add_picture keeps the
+            # aspect ratio and reads the image header itself
             doc_width = min(max_width, image_block.width / 72)  # Convert to inches
 
             # Add image
@@ -320,9 +466,14 @@ class DOCXGenerator:
         table = self.doc.add_table(rows=len(rows), cols=len(rows[0]))
         table.style = 'Light Grid Accent 1'
 
-        for i, row_data in enumerate(rows):
-            for j, cell_text in enumerate(row_data):
-                table.rows[i].cells[j].text = str(cell_text)
+        # Fill the cells' XML directly: Table.rows/cells rebuild the cell grid on
+        # every access and the Cell.text setter replaces the paragraph each time.
+        # A new cell holds only its properties and an empty paragraph, so adding
+        # the run to that paragraph gives the same markup as Cell.text.
+        for tr, row_data in zip(table._tbl.tr_lst, rows):
+            for tc, cell_text in zip(tr.tc_lst, row_data):
+                run = etree.SubElement(tc[-1], W_R)
+                run.text = str(cell_text)
 
     def save(self, output_path: str):
         """Save the document"""
@@ -338,46 +489,46 @@ class PDF2DOCXConverter:
         self.analyzer = LayoutAnalyzer()
         self.generator = DOCXGenerator()
 
-    def convert(self, output_path: str, verbose: bool = True):
-        """Convert PDF to DOCX"""
+    def _iter_pages(self, page_count: int, workers: int):
+        """Yield _analyze_page results for each page in order, using worker processes for long documents"""
+        if workers > 1 and page_count >= PARALLEL_MIN_PAGES:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_page_worker,
+                initargs=(self.pdf_path, self.analyzer.tolerance_y, self.analyzer.tolerance_x)
+            ) as executor:
+                chunksize = max(1, page_count // (4 * workers))
+                yield from executor.map(_process_page, range(page_count), chunksize=chunksize)
+        else:
+            for page_num in range(page_count):
+                yield _analyze_page(self.extractor, self.analyzer, page_num)
+
+    def convert(self, output_path: str, verbose: bool = True, workers: Optional[int] = None):
+        """
+        Convert PDF to DOCX
+
+        Pages are extracted and laid out in parallel (up to `workers`
+        processes, default one per CPU); the DOCX is assembled here in page order.
+        """
         page_count = self.extractor.get_page_count()
+        if workers is None:
+            workers = os.cpu_count() or 1
 
         if verbose:
             print(f"Converting {page_count} page(s) from PDF to DOCX...")
 
-        all_text_blocks = []
+        text_block_count = 0
 
         # Extract all content
-        for page_num in range(page_count):
+        for page_num, (lines, images, page_text_blocks) in enumerate(self._iter_pages(page_count, workers)):
             if verbose:
                 print(f"  Processing page {page_num + 1}/{page_count}...")
 
-            # Extract text blocks
-            text_blocks = self.extractor.extract_text_blocks(page_num)
-            all_text_blocks.extend(text_blocks)
-
-            # Extract images
-            images = self.extractor.extract_images(page_num)
-
-            # Combine text and images, sorted by Y position
-            elements = []
-            elements.extend([(b.y, 'text', b) for b in text_blocks])
-            elements.extend([(img.y, 'image', img) for img in images])
-            elements.sort(key=lambda x: x[0])
-
-            # Calculate average font size for heading detection
-            avg_font_size = sum(b.font_size for b in text_blocks) / len(text_blocks) if text_blocks else 12
-
-            # Group text blocks into lines
-            lines = self.analyzer.group_into_lines(text_blocks)
+            text_block_count += page_text_blocks
 
             # Process each line
-            for line in lines:
-                merged_block = self.analyzer.merge_line_blocks(line)
-                if merged_block:
-                    # Classify as heading or normal text
-                    heading_level = self.analyzer.classify_heading(merged_block, avg_font_size)
-                    self.generator.add_text_block(merged_block, heading_level)
+            for merged_block, heading_level in lines:
+                self.generator.add_text_block(merged_block, heading_level)
 
             # Add images
             for img in images:
@@ -385,20 +536,20 @@ class PDF2DOCXConverter:
 
             # Add page break if not last page
             if page_num < page_count - 1:
-                self.generator.doc.add_page_break()
+                self.generator.add_page_break()
 
         # Save the document
         self.generator.save(output_path)
 
         if verbose:
             print(f"✓ Conversion complete: {output_path}")
-            print(f"  Extracted {len(all_text_blocks)} text blocks")
+            print(f"  Extracted {text_block_count} text blocks")
 
         # Cleanup
         self.extractor.close()
 
 
-def convert_pdf_to_docx(pdf_path: str, output_path: str = None, verbose: bool = True) -> str:
+def convert_pdf_to_docx(pdf_path: str, output_path: str = None, verbose: bool = True, workers: Optional[int] = None) -> str:
     """
     Convert a PDF file to DOCX format
 
@@ -406,6 +557,7 @@ def convert_pdf_to_docx(pdf_path: str, output_path: str = None, verbose: bool =
         pdf_path: Path to input PDF file
         output_path: Path to output DOCX file (optional)
         verbose: Print progress messages
+        workers: Processes used to extract long documents (default: one per CPU)
 
     Returns:
         Path to the generated DOCX file
@@ -414,6 +566,6 @@ def convert_pdf_to_docx(pdf_path: str, output_path: str = None, verbose: bool =
         output_path = pdf_path.replace('.pdf', '.docx')
 
     converter = PDF2DOCXConverter(pdf_path)
-    converter.convert(output_path, verbose=verbose)
+    converter.convert(output_path, verbose=verbose, workers=workers)
 
     return output_path
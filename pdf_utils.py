@@ -3,16 +3,35 @@ PDF utilities for page numbering and other operations using ReportLab and PyPDF
 """
 
 import io
+import string
+import struct
 import subprocess
 import tempfile
 import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import List, Dict, Tuple
+from typing import Callable, Iterator, List, Dict, Optional, Tuple, Union
 
 from PIL import Image
 from pypdf import PdfReader, PdfWriter
-from reportlab.lib.colors import Color
-from reportlab.pdfgen import canvas
+from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, IndirectObject, NameObject
+from reportlab.lib.rl_accel import fp_str
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+try:
+    import pymupdf
+except ImportError:  # optional speedup, images are extracted with PyPDF without it
+    pymupdf = None
+
+try:
+    import pikepdf
+except ImportError:  # optional speedup, the Ghostscript fallback uses PyPDF without it
+    pikepdf = None
+
+
+# Any bytes-like object holding a PDF (bytes, bytearray or a memoryview over an upload buffer)
+PdfBuffer = Union[bytes, bytearray, memoryview]
 
 
 class PageNumberPosition(str, Enum):
@@ -28,8 +47,95 @@ class PageNumberPosition(str, Enum):
     BOTTOM_RIGHT = "bottom_right"
 
 
+# Font resource added to numbered pages (Helvetica, like ReportLab's default font)
+PAGE_NUMBER_FONT_NAME = "/PageNumberFont"
+PAGE_NUMBER_FONT = "Helvetica"
+
+# Placeholders allowed in page number format strings
+PAGE_NUMBER_FIELDS = ("page", "total")
+
+
+def compile_page_number_format(format_string: str) -> Callable[[int, int], str]:
+    """
+    Turn a page number format string into a fast renderer.
+
+    The template is parsed once and converted to a %-style template, instead
+    of str.format() re-parsing it for every page. Only bare {page} and {total}
+    placeholders are accepted; anything else (attribute access, indexing,
+    format specs, other names) is rejected.
+
+    Args:
+        format_string: Format string such as "Page {page} of {total}"
+
+    Returns:
+        Function mapping (page, total) to the page number text
+
+    Raises:
+        ValueError: If the format string is malformed or uses other fields
+
+    Example:
+        >>> render = compile_page_number_format("{page}/{total}")
+        >>> render(3, 10)
+        '3/10'
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(format_string):
+        parts.append(literal.replace("%", "%%"))
+        if field is None:
+            continue
+        if field not in PAGE_NUMBER_FIELDS or spec or conversion:
+            raise ValueError("Only {page} and {total} placeholders are allowed in the format string")
+        parts.append(f"%({field})d")
+
+    template = "".join(parts)
+    return lambda page, total: template % {"page": page, "total": total}
+
+
+def _pdf_text(text: str) -> Tuple[bytes, str]:
+    """
+    Encode text as a PDF literal string for a standard font's WinAnsiEncoding.
+
+    Returns:
+        The literal string, and the text it really shows (characters outside
+        the encoding become "?") for measuring its width
+    """
+    encoded = text.encode("cp1252", errors="replace")
+    literal = encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").replace(b"\r", b"\\r")
+    return b"(" + literal + b")", encoded.decode("cp1252")
+
+
+def _content_stream(data: bytes) -> DecodedStreamObject:
+    """Content stream object holding data"""
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return stream
+
+
+def _page_font_name(page, font_ref: IndirectObject) -> str:
+    """
+    Add the page number font to a page's resources and return its resource name.
+
+    Resources shared between pages get the font once. If the page already
+    uses PAGE_NUMBER_FONT_NAME for another font, a numbered variant is used.
+    """
+    if "/Resources" not in page:
+        page[NameObject("/Resources")] = DictionaryObject()
+    resources = page["/Resources"]
+    if "/Font" not in resources:
+        resources[NameObject("/Font")] = DictionaryObject()
+    fonts = resources["/Font"]
+
+    name = PAGE_NUMBER_FONT_NAME
+    suffix = 0
+    while name in fonts and fonts.raw_get(name) != font_ref:
+        suffix += 1
+        name = f"{PAGE_NUMBER_FONT_NAME}{suffix}"
+    fonts[NameObject(name)] = font_ref
+    return name
+
+
 def add_page_numbers(
-    pdf_bytes: bytes,
+    pdf_bytes: PdfBuffer,
     position: PageNumberPosition = PageNumberPosition.BOTTOM_CENTER,
     font_size: int = 12,
     font_color: tuple = (0, 0, 0),  # RGB 0-255
@@ -38,10 +144,14 @@ def add_page_numbers(
     format_string: str = "{page}"
 ) -> bytes:
     """
-    Add page numbers to a PDF document using ReportLab and PyPDF.
+    Add page numbers to a PDF document using PyPDF.
+
+    Each page gets a small content stream drawing its number in Helvetica,
+    appended after its own content, which is left untouched (not parsed or
+    re-encoded). The text is placed with ReportLab's font metrics.
 
     Args:
-        pdf_bytes: PDF file as bytes
+        pdf_bytes: PDF file as bytes or any bytes-like buffer
         position: Position of page numbers (9 positions available)
         font_size: Font size for page numbers
         font_color: RGB color tuple (0-255 range)
@@ -52,91 +162,90 @@ def add_page_numbers(
     Returns:
         Modified PDF as bytes
 
+    Raises:
+        ValueError: If format_string uses placeholders other than {page} and {total}
+
     Example:
         >>> pdf_bytes = open('input.pdf', 'rb').read()
         >>> result = add_page_numbers(pdf_bytes, position=PageNumberPosition.BOTTOM_CENTER)
         >>> open('output.pdf', 'wb').write(result)
     """
+    render_page_number = compile_page_number_format(format_string)
+
     # Read the input PDF
     input_pdf = PdfReader(io.BytesIO(pdf_bytes))
     output_pdf = PdfWriter()
 
-    # Convert RGB from 0-255 to 0-1 range for ReportLab
-    color = Color(
-        font_color[0] / 255.0,
-        font_color[1] / 255.0,
-        font_color[2] / 255.0
+    # Walk the page tree once: iterating input_pdf.pages re-checks its length
+    # (and may look pages up again) on every step
+    pages = list(input_pdf.pages)
+    total_pages = len(pages)
+
+    # Where to draw, chosen once for all pages: position values are "<row>_<column>".
+    # x_of maps (page width, text width) to where the text starts.
+    row, column = position.value.split("_")
+    x_of = {
+        "left": lambda width, text_width: margin,
+        "center": lambda width, text_width: width / 2 - text_width / 2,
+        "right": lambda width, text_width: width - margin - text_width
+    }[column]
+    y_of = {"top": lambda height: height - margin, "middle": lambda height: height / 2, "bottom": lambda height: margin}[row]
+
+    # Text state and fill color (RGB from 0-255 to 0-1), the same for every number
+    text_setup = "%s %s %s rg BT %%s %s Tf" % (
+        fp_str(font_color[0] / 255.0),
+        fp_str(font_color[1] / 255.0),
+        fp_str(font_color[2] / 255.0),
+        fp_str(font_size)
     )
 
-    # Process each page
-    for page_num in range(len(input_pdf.pages)):
-        page = input_pdf.pages[page_num]
-
-        # Get page dimensions
-        page_width = float(page.mediabox.width)
-        page_height = float(page.mediabox.height)
-
-        # Create a new PDF with the page number
-        packet = io.BytesIO()
-        can = canvas.Canvas(packet, pagesize=(page_width, page_height))
-
-        # Format the page number text
-        page_number_text = format_string.format(
-            page=page_num + start_page,
-            total=len(input_pdf.pages)
-        )
-
-        # Set font and color
-        can.setFont("Helvetica", font_size)
-        can.setFillColor(color)
-
-        # Calculate position and draw text
-        if position == PageNumberPosition.TOP_LEFT:
-            x = margin
-            y = page_height - margin
-            can.drawString(x, y, page_number_text)
-        elif position == PageNumberPosition.TOP_CENTER:
-            x = page_width / 2
-            y = page_height - margin
-            can.drawCentredString(x, y, page_number_text)
-        elif position == PageNumberPosition.TOP_RIGHT:
-            x = page_width - margin
-            y = page_height - margin
-            can.drawRightString(x, y, page_number_text)
-        elif position == PageNumberPosition.MIDDLE_LEFT:
-            x = margin
-            y = page_height / 2
-            can.drawString(x, y, page_number_text)
-        elif position == PageNumberPosition.MIDDLE_CENTER:
-            x = page_width / 2
-            y = page_height / 2
-            can.drawCentredString(x, y, page_number_text)
-        elif position == PageNumberPosition.MIDDLE_RIGHT:
-            x = page_width - margin
-            y = page_height / 2
-            can.drawRightString(x, y, page_number_text)
-        elif position == PageNumberPosition.BOTTOM_LEFT:
-            x = margin
-            y = margin
-            can.drawString(x, y, page_number_text)
-        elif position == PageNumberPosition.BOTTOM_CENTER:
-            x = page_width / 2
-            y = margin
-            can.drawCentredString(x, y, page_number_text)
-        else:  # BOTTOM_RIGHT
-            x = page_width - margin
-            y = margin
-            can.drawRightString(x, y, page_number_text)
-
-        can.save()
-
-        # Move to the beginning of the BytesIO buffer
-        packet.seek(0)
-        overlay_pdf = PdfReader(packet)
-
-        # Merge the overlay with the original page
-        page.merge_page(overlay_pdf.pages[0])
-        output_pdf.add_page(page)
+    # Objects shared by all pages: the font, and a stream saving the graphics
+    # state before the page's own content so that it can't move or restyle the number.
+    # Streams must be indirect objects, and PdfWriter only offers the private
+    # _add_object for that (pypdf's major version is capped in pyproject.toml).
+    font_ref = output_pdf._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject(f"/{PAGE_NUMBER_FONT}"),
+        NameObject("/Encoding"): NameObject("/WinAnsiEncoding")
+    }))
+    save_state_ref = output_pdf._add_object(_content_stream(b"q\n"))
+
+    # Number stream for each distinct (page size, text, font name): pages with
+    # the same size and text (e.g. a format string without {page}) share it
+    number_refs = {}
+
+    for page_num, page in enumerate(pages):
+        # Get page dimensions (mediabox is resolved anew on every access)
+        mediabox = page.mediabox
+        page_size = (float(mediabox.width), float(mediabox.height))
+        page_number_text = render_page_number(page_num + start_page, total_pages)
+
+        page = output_pdf.add_page(page)
+        font_name = _page_font_name(page, font_ref)
+
+        key = (page_size, page_number_text, font_name)
+        number_ref = number_refs.get(key)
+        if number_ref is None:
+            literal, shown_text = _pdf_text(page_number_text)
+            text_width = stringWidth(shown_text, PAGE_NUMBER_FONT, font_size)
+            x = x_of(page_size[0], text_width)
+            y = y_of(page_size[1])
+            number_ref = number_refs[key] = output_pdf._add_object(_content_stream(
+                b"Q q %s 1 0 0 1 %s %s Tm %s Tj ET Q\n" % (
+                    (text_setup % font_name).encode(), fp_str(x).encode(), fp_str(y).encode(), literal
+                )
+            ))
+
+        # Draw the number after the page's content streams, in a fresh graphics state
+        contents = page.raw_get("/Contents") if "/Contents" in page else None
+        if contents is None:
+            streams = []
+        elif isinstance(contents.get_object(), ArrayObject):
+            streams = list(contents.get_object())
+        else:
+            streams = [contents]
+        page[NameObject("/Contents")] = ArrayObject([save_state_ref, *streams, number_ref])
 
     # Save to bytes
     output_bytes = io.BytesIO()
@@ -146,18 +255,309 @@ def add_page_numbers(
     return output_bytes.getvalue()
 
 
-def extract_images_from_pdf(pdf_bytes: bytes) -> List[Dict[str, any]]:
+# Output format for each extension PyMuPDF's extract_image() returns as is;
+# images in other formats are converted to PNG
+PYMUPDF_IMAGE_FORMATS = {"jpeg": "JPEG", "jpx": "JPEG2000", "png": "PNG"}
+
+# Format and extension of PyPDF-extracted images, by the last filter of their
+# stream; images with other filters, or none, are converted to PNG
+PDF_FILTER_FORMATS = {
+    '/DCTDecode': ('JPEG', 'jpg'),
+    '/FlateDecode': ('PNG', 'png'),
+    '/JPXDecode': ('JPEG2000', 'jp2'),
+}
+
+
+# zlib level for images re-encoded as PNG by the PyPDF extraction (PIL's default is 6)
+PNG_COMPRESS_LEVEL = 1
+
+# Channels in the PDF color spaces whose FlateDecode images are written as PNG directly
+# (ICCBased color spaces are matched by their number of components instead)
+PDF_COLOR_CHANNELS = {'/DeviceGray': 1, '/DeviceRGB': 3}
+
+# PNG color type and allowed bit depths for gray and RGB images, by channel count
+PNG_COLOR_TYPES = {
+    1: (0, (1, 2, 4, 8, 16)),
+    3: (2, (8, 16)),
+}
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_IHDR = struct.Struct('>IIBBBBB')
+_PNG_UINT = struct.Struct('>I')
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """One PNG chunk: length, type, data and CRC"""
+    return _PNG_UINT.pack(len(data)) + chunk_type + data + _PNG_UINT.pack(zlib.crc32(data, zlib.crc32(chunk_type)))
+
+
+def _flate_image_to_png(obj) -> Optional[bytes]:
+    """
+    Write a FlateDecode gray or RGB image as a PNG file, or return None if PNG can't hold it as is.
+
+    The pixels are kept as they are; ICC profiles and soft masks are dropped,
+    as they are when PIL converts the image.
+
+    A stream that is only FlateDecode with PNG predictors already is PNG's
+    IDAT data and is copied without being inflated. Otherwise the decoded
+    rows get PNG's (none) filter byte and are deflated again.
     """
-    Extract all images from a PDF document using PyPDF (fast and lightweight).
+    def get(key, default=None):
+        # Unlike DictionaryObject.get, indexing resolves indirect objects
+        return obj[key] if key in obj else default
+
+    filters = get('/Filter')
+    if not isinstance(filters, ArrayObject):
+        filters = [filters]
+    if not filters or filters[-1] != '/FlateDecode' or '/Decode' in obj or get('/ImageMask'):
+        return None
+
+    color_space = get('/ColorSpace')
+    if isinstance(color_space, ArrayObject) and len(color_space) == 2 and color_space[0] == '/ICCBased':
+        channels = color_space[1].get_object().get('/N')
+    elif isinstance(color_space, str):
+        channels = PDF_COLOR_CHANNELS.get(color_space)
+    else:
+        channels = None
+    if channels not in PNG_COLOR_TYPES:
+        return None
+    color_type, bit_depths = PNG_COLOR_TYPES[channels]
+    bits = get('/BitsPerComponent', 8)
+    if bits not in bit_depths:
+        return None
+
+    width = obj['/Width']
+    height = obj['/Height']
+
+    parms = get('/DecodeParms')
+    if isinstance(parms, ArrayObject):
+        parms = parms[-1].get_object() if parms else None
+    if (
+        len(filters) == 1
+        and isinstance(parms, DictionaryObject)
+        and parms.get('/Predictor', 1) >= 10
+        and parms.get('/Colors', 1) == channels
+        and parms.get('/BitsPerComponent', 8) == bits
+        and parms.get('/Columns', 1) == width
+    ):
+        idat = obj._data
+    else:
+        data = obj.get_data()
+        row_size = (width * channels * bits + 7) // 8
+        if len(data) < row_size * height:
+            return None
+
+        # Each PNG row starts with its filter type, 0 (none)
+        rows = bytearray((row_size + 1) * height)
+        view = memoryview(data)
+        for y in range(height):
+            start = y * (row_size + 1) + 1
+            rows[start:start + row_size] = view[y * row_size:(y + 1) * row_size]
+        idat = zlib.compress(rows, PNG_COMPRESS_LEVEL)
+
+    return b''.join((
+        PNG_SIGNATURE,
+        _png_chunk(b'IHDR', _PNG_IHDR.pack(width, height, bits, color_type, 0, 0, 0)),
+        _png_chunk(b'IDAT', idat),
+        _png_chunk(b'IEND', b'')
+    ))
+
+
+def iter_images_from_pdf(pdf_bytes: PdfBuffer) -> Iterator[Dict[str, any]]:
+    """
+    Extract images from a PDF document one at a time.
+
+    Uses PyMuPDF when it is installed, which decodes images in C, and PyPDF
+    otherwise. Images are yielded as soon as they are decoded, so a caller
+    that consumes them lazily (e.g. to stream a ZIP) only holds one image in
+    memory at a time.
+
+    Args:
+        pdf_bytes: PDF file as bytes or any bytes-like buffer
+
+    Yields:
+        Dictionaries with image data and metadata, as described in extract_images_from_pdf
+    """
+    if pymupdf is not None:
+        return _iter_images_pymupdf(pdf_bytes)
+    return _iter_images_pypdf(pdf_bytes)
+
+
+def _iter_images_pymupdf(pdf_bytes: PdfBuffer) -> Iterator[Dict[str, any]]:
+    """iter_images_from_pdf using PyMuPDF"""
+    doc = pymupdf.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        global_index = 0
+
+        for page_num, page in enumerate(doc, start=1):
+            for img in page.get_images(full=True):
+                xref = img[0]
+                try:
+                    # JPEG and JPEG 2000 images come back as stored in the PDF,
+                    # the others already decoded and encoded as PNG
+                    info = doc.extract_image(xref)
+                    img_format = PYMUPDF_IMAGE_FORMATS.get(info["ext"])
+                    img_bytes = info["image"]
+                    if img_format is None:
+                        # Other formats (e.g. JBIG2) are converted to PNG for consistency
+                        img_bytes = pymupdf.Pixmap(doc, xref).tobytes("png")
+                        img_format = "PNG"
+                except Exception as e:
+                    print(f"Warning: Could not extract image from page {page_num}: {e}")
+                    continue
+
+                yield {
+                    "image_bytes": img_bytes,
+                    "page": page_num,
+                    "index": global_index,
+                    "width": info["width"],
+                    "height": info["height"],
+                    "format": img_format,
+                    "original_format": img_format
+                }
+                global_index += 1
+    finally:
+        doc.close()
+
+
+def _iter_images_pypdf(pdf_bytes: PdfBuffer) -> Iterator[Dict[str, any]]:
+    """iter_images_from_pdf using PyPDF"""
+    # Read the PDF
+    pdf_reader = PdfReader(io.BytesIO(pdf_bytes))
+    global_index = 0
+
+    # One encoding buffer for every PNG: it is rewound rather than truncated,
+    # so its allocation is kept and only grows to fit the largest image
+    png_buffer = io.BytesIO()
+
+    # Image XObjects of each XObject dictionary, by object number: pages often
+    # share one dictionary, which is then only resolved and scanned once
+    image_xobjects = {}
+
+    # Iterate through each page
+    for page_num, page in enumerate(pdf_reader.pages, start=1):
+        # Extract images from the page
+        resources = page['/Resources'] if '/Resources' in page else None
+        if resources is None or '/XObject' not in resources:
+            continue
+
+        ref = resources.raw_get('/XObject')
+        key = (ref.idnum, ref.generation) if isinstance(ref, IndirectObject) else None
+        images = image_xobjects.get(key) if key is not None else None
+        if images is None:
+            xObject = resources['/XObject']
+            # Indexing rather than DictionaryObject.get, which doesn't resolve indirect objects
+            images = [
+                obj for obj in (xObject[name] for name in xObject)
+                if '/Subtype' in obj and obj['/Subtype'] == '/Image'
+            ]
+            if key is not None:
+                image_xobjects[key] = images
+
+        for obj in images:
+            try:
+                # Get image properties
+                width = obj['/Width']
+                height = obj['/Height']
+
+                # Try to determine format
+                filter_type = obj['/Filter'] if '/Filter' in obj else None
+                # With a filter chain (e.g. ASCII85 then DCT), the last
+                # filter gives the format of the decoded data
+                if isinstance(filter_type, ArrayObject):
+                    filter_type = filter_type[-1] if filter_type else None
+                img_format, ext = PDF_FILTER_FORMATS.get(filter_type, ('PNG', 'png'))
+
+                # Gray and RGB FlateDecode images are written as PNG directly,
+                # without PIL decoding the pixels
+                if img_format == 'PNG':
+                    png_bytes = _flate_image_to_png(obj)
+                    if png_bytes is not None:
+                        yield {
+                            "image_bytes": png_bytes,
+                            "page": page_num,
+                            "index": global_index,
+                            "width": width,
+                            "height": height,
+                            "format": "PNG",
+                            "original_format": img_format
+                        }
+                        global_index += 1
+                        continue
+
+                # Extract image data
+                img_data = obj.get_data()
+
+                # DCTDecode and JPXDecode streams already are JPEG/JPEG 2000
+                # files: return them as is rather than decoding and
+                # re-encoding them as PNG
+                if img_format in ('JPEG', 'JPEG2000'):
+                    yield {
+                        "image_bytes": img_data,
+                        "page": page_num,
+                        "index": global_index,
+                        "width": width,
+                        "height": height,
+                        "format": img_format,
+                        "original_format": img_format
+                    }
+                    global_index += 1
+                    continue
+
+                # Convert to PIL Image and then to PNG for consistency
+                try:
+                    pil_image = Image.open(io.BytesIO(img_data))
+
+                    # Convert to PNG bytes. The PNG only gives every image the
+                    # same format, so favour encoding speed over size
+                    png_buffer.seek(0)
+                    pil_image.save(png_buffer, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+                    with png_buffer.getbuffer() as view:
+                        img_bytes = bytes(view[:png_buffer.tell()])
+
+                    yield {
+                        "image_bytes": img_bytes,
+                        "page": page_num,
+                        "index": global_index,
+                        "width": pil_image.width,
+                        "height": pil_image.height,
+                        "format": "PNG",
+                        "original_format": img_format
+                    }
+                    global_index += 1
+                except Exception as e:
+                    # If PIL fails, use raw data
+                    print(f"Warning: Could not convert image to PNG on page {page_num}: {e}")
+                    yield {
+                        "image_bytes": img_data,
+                        "page": page_num,
+                        "index": global_index,
+                        "width": width,
+                        "height": height,
+                        "format": img_format,
+                        "original_format": img_format
+                    }
+                    global_index += 1
+
+            except Exception as e:
+                print(f"Warning: Could not extract image from page {page_num}: {e}")
+                continue
+
+
+def extract_images_from_pdf(pdf_bytes: PdfBuffer) -> List[Dict[str, any]]:
+    """
+    Extract all images from a PDF document (with PyMuPDF, or PyPDF as a fallback).
+
+    See iter_images_from_pdf to extract them lazily.
 
     Args:
-        pdf_bytes: PDF file as bytes
+        pdf_bytes: PDF file as bytes or any bytes-like buffer
 
     Returns:
         List of dictionaries containing image data with metadata:
         [
             {
-                "image_bytes": bytes (original format or PNG),
+                "image_bytes": bytes (JPEG/JPEG 2000 as stored in the PDF, otherwise PNG or the original format),
                 "page": int (page number, 1-indexed),
                 "index": int (global image index),
                 "width": int,
@@ -173,87 +573,7 @@ def extract_images_from_pdf(pdf_bytes: bytes) -> List[Dict[str, any]]:
         ...     with open(f'image_{i}.{img_data["format"].lower()}', 'wb') as f:
         ...         f.write(img_data['image_bytes'])
     """
-    # Read the PDF
-    pdf_reader = PdfReader(io.BytesIO(pdf_bytes))
-    images = []
-    global_index = 0
-
-    # Iterate through each page
-    for page_num, page in enumerate(pdf_reader.pages, start=1):
-        # Extract images from the page
-        if '/Resources' in page and '/XObject' in page['/Resources']:
-            xObject = page['/Resources']['/XObject'].get_object()
-
-            for obj_name in xObject:
-                obj = xObject[obj_name]
-
-                # Check if it's an image
-                if obj['/Subtype'] == '/Image':
-                    try:
-                        # Get image properties
-                        width = obj['/Width']
-                        height = obj['/Height']
-
-                        # Try to determine format
-                        if '/Filter' in obj:
-                            filter_type = obj['/Filter']
-                            if filter_type == '/DCTDecode':
-                                img_format = 'JPEG'
-                                ext = 'jpg'
-                            elif filter_type == '/FlateDecode':
-                                img_format = 'PNG'
-                                ext = 'png'
-                            elif filter_type == '/JPXDecode':
-                                img_format = 'JPEG2000'
-                                ext = 'jp2'
-                            else:
-                                img_format = 'PNG'  # Default
-                                ext = 'png'
-                        else:
-                            img_format = 'PNG'
-                            ext = 'png'
-
-                        # Extract image data
-                        img_data = obj.get_data()
-
-                        # Convert to PIL Image and then to PNG for consistency
-                        try:
-                            pil_image = Image.open(io.BytesIO(img_data))
-
-                            # Convert to PNG bytes
-                            img_bytes_io = io.BytesIO()
-                            pil_image.save(img_bytes_io, format='PNG')
-                            img_bytes = img_bytes_io.getvalue()
-
-                            images.append({
-                                "image_bytes": img_bytes,
-                                "page": page_num,
-                                "index": global_index,
-                                "width": pil_image.width,
-                                "height": pil_image.height,
-                                "format": "PNG",
-                                "original_format": img_format
-                            })
-                            global_index += 1
-                        except Exception as e:
-                            # If PIL fails, use raw data
-                            print(f"Warning: Could not convert image to PNG on page {page_num}: {e}")
-                            images.append({
-                                "image_bytes": img_data,
-                                "page": page_num,
-                                "index": global_index,
-                                "width": width,
-                                "height": height,
-                                "format": img_format,
-                                "original_format": img_format
-                            })
-                            global_index += 1
-
-                    except Exception as e:
-                        print(f"Warning: Could not extract image from page {page_num}: {e}")
-                        continue
-
-    return images
+    return list(iter_images_from_pdf(pdf_bytes))
 
 
 class CompressionQuality(str, Enum):
@@ -263,138 +583,305 @@ class CompressionQuality(str, Enum):
     LOW = "low"
 
 
-def compress_pdf(
-    pdf_bytes: bytes,
-    quality: CompressionQuality = CompressionQuality.MEDIUM
-) -> Tuple[bytes, int, int]:
+# Ghostscript quality settings
+GS_QUALITY_SETTINGS = {
+    CompressionQuality.HIGH: '/ebook',      # 150 DPI, good quality
+    CompressionQuality.MEDIUM: '/screen',   # 72 DPI, medium quality
+    CompressionQuality.LOW: '/screen',      # 72 DPI with more aggressive settings
+}
+
+GS_DPI_SETTINGS = {
+    CompressionQuality.HIGH: '150',
+    CompressionQuality.MEDIUM: '100',
+    CompressionQuality.LOW: '72',
+}
+
+
+# Version reported by the first successful Ghostscript probe
+_ghostscript = {"version": None}
+
+
+def _ghostscript_version() -> Optional[str]:
     """
-    Compress a PDF using Ghostscript.
+    Version of the installed Ghostscript, or None if it can't be run.
 
-    Args:
-        pdf_bytes: PDF file as bytes
-        quality: Compression quality level (high, medium, low)
+    A successful probe is kept for the life of the process rather than
+    repeated per request, since each probe launches Ghostscript. Failures
+    (e.g. a timeout on a loaded host) are not kept, so the next call retries.
+    """
+    if _ghostscript["version"] is not None:
+        return _ghostscript["version"]
+    try:
+        gs_check = subprocess.run(['gs', '--version'], capture_output=True, timeout=5)
+    except (subprocess.SubprocessError, OSError):
+        return None
+    if gs_check.returncode != 0:
+        return None
+    _ghostscript["version"] = gs_check.stdout.decode().strip()
+    return _ghostscript["version"]
+
+
+def _write_temp_pdf(pdf_bytes: PdfBuffer) -> str:
+    """Write PDF bytes to a temporary file and return its path (caller deletes it)"""
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    try:
+        # Unbuffered writes straight from the caller's buffer; os.write may
+        # write less than asked for, so write until nothing is left
+        view = memoryview(pdf_bytes)
+        while view:
+            view = view[os.write(fd, view):]
+    except BaseException:
+        os.close(fd)
+        os.unlink(path)
+        raise
+    os.close(fd)
+    return path
+
+
+def _run_ghostscript(input_path: str, output: str, quality: CompressionQuality) -> bytes:
+    """
+    Run Ghostscript on a PDF file, writing to output (a path, or "-" for stdout).
 
     Returns:
-        Tuple of (compressed_pdf_bytes, original_size, compressed_size)
+        The compressed PDF when output is "-", otherwise b"" (stdout is discarded)
 
     Raises:
-        RuntimeError: If Ghostscript is not available or compression fails
+        RuntimeError: If compression fails
     """
-    # Ghostscript quality settings
-    quality_settings = {
-        CompressionQuality.HIGH: '/ebook',      # 150 DPI, good quality
-        CompressionQuality.MEDIUM: '/screen',   # 72 DPI, medium quality
-        CompressionQuality.LOW: '/screen',      # 72 DPI with more aggressive settings
-    }
+    # Build Ghostscript command
+    gs_command = [
+        'gs',
+        '-sDEVICE=pdfwrite',
+        '-dCompatibilityLevel=1.4',
+        f'-dPDFSETTINGS={GS_QUALITY_SETTINGS[quality]}',
+        '-dNOPAUSE',
+        '-dQUIET',
+        '-dBATCH',
+        # Keep PostScript-level messages off stdout, which may carry the PDF
+        '-sstdout=%stderr',
+        '-dDownsampleColorImages=true',
+        f'-dColorImageResolution={GS_DPI_SETTINGS[quality]}',
+        '-dDownsampleGrayImages=true',
+        f'-dGrayImageResolution={GS_DPI_SETTINGS[quality]}',
+        '-dDownsampleMonoImages=true',
+        f'-dMonoImageResolution={GS_DPI_SETTINGS[quality]}',
+        f'-sOutputFile={output}',
+        input_path
+    ]
+
+    # Run Ghostscript
+    print(f"[Compress PDF] Running Ghostscript with quality: {quality}")
+    # stdout is only kept when it carries the PDF; messages go to stderr,
+    # which is decoded only if Ghostscript fails
+    result = subprocess.run(
+        gs_command,
+        stdout=subprocess.PIPE if output == '-' else subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=55  # 55 second timeout
+    )
 
-    dpi_settings = {
-        CompressionQuality.HIGH: '150',
-        CompressionQuality.MEDIUM: '100',
-        CompressionQuality.LOW: '72',
-    }
+    if result.returncode != 0:
+        stderr = result.stderr.decode('utf-8', errors='replace')
+        print(f"[Compress PDF] Ghostscript stderr: {stderr}")
+        raise RuntimeError(f"Ghostscript failed with code {result.returncode}: {stderr}")
 
-    original_size = len(pdf_bytes)
+    return result.stdout or b''
+
+
+def compress_pdf_file_to_file(
+    input_path: str,
+    quality: CompressionQuality = CompressionQuality.MEDIUM
+) -> Tuple[str, int, int]:
+    """
+    Compress a PDF file on disk using Ghostscript, leaving the result on disk.
+
+    Lets callers send the output straight from the file (e.g. with sendfile)
+    instead of reading it into memory. Does not check that Ghostscript is
+    installed.
+
+    Args:
+        input_path: Path of the PDF file to compress
+        quality: Compression quality level (high, medium, low)
+
+    Returns:
+        Tuple of (output_path, original_size, compressed_size); the caller
+        deletes output_path
 
-    # Create temporary files
-    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as input_file:
-        input_path = input_file.name
-        input_file.write(pdf_bytes)
+    Raises:
+        RuntimeError: If compression fails
+    """
+    original_size = os.path.getsize(input_path)
 
     with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as output_file:
         output_path = output_file.name
 
     try:
-        # First check if Ghostscript is available
+        _run_ghostscript(input_path, output_path, quality)
+
+        compressed_size = os.path.getsize(output_path)
+        print(f"[Compress PDF] Compressed ({quality.value}) from {original_size / 1024 / 1024:.2f}MB to {compressed_size / 1024 / 1024:.2f}MB")
+
+        return output_path, original_size, compressed_size
+
+    except:
+        # Clean up temp file
         try:
-            gs_check = subprocess.run(['gs', '--version'], capture_output=True, timeout=5)
-            if gs_check.returncode != 0:
-                raise RuntimeError("Ghostscript not available")
-            print(f"[Compress PDF] Ghostscript version: {gs_check.stdout.decode().strip()}")
-        except (subprocess.SubprocessError, FileNotFoundError) as e:
-            raise RuntimeError(f"Ghostscript not installed: {e}")
-
-        # Build Ghostscript command
-        gs_command = [
-            'gs',
-            '-sDEVICE=pdfwrite',
-            '-dCompatibilityLevel=1.4',
-            f'-dPDFSETTINGS={quality_settings[quality]}',
-            '-dNOPAUSE',
-            '-dQUIET',
-            '-dBATCH',
-            '-dDownsampleColorImages=true',
-            f'-dColorImageResolution={dpi_settings[quality]}',
-            '-dDownsampleGrayImages=true',
-            f'-dGrayImageResolution={dpi_settings[quality]}',
-            '-dDownsampleMonoImages=true',
-            f'-dMonoImageResolution={dpi_settings[quality]}',
-            f'-sOutputFile={output_path}',
-            input_path
-        ]
+            os.unlink(output_path)
+        except:
+            pass
+        raise
 
-        # Run Ghostscript
-        print(f"[Compress PDF] Running Ghostscript with quality: {quality}")
-        result = subprocess.run(
-            gs_command,
-            capture_output=True,
-            text=True,
-            timeout=55  # 55 second timeout
-        )
 
-        if result.returncode != 0:
-            print(f"[Compress PDF] Ghostscript stderr: {result.stderr}")
-            print(f"[Compress PDF] Ghostscript stdout: {result.stdout}")
-            raise RuntimeError(f"Ghostscript failed with code {result.returncode}: {result.stderr}")
+def compress_pdf_file(
+    input_path: str,
+    quality: CompressionQuality = CompressionQuality.MEDIUM
+) -> Tuple[bytes, int, int]:
+    """
+    Compress a PDF file on disk using Ghostscript.
+
+    Several calls can share the same input file, which lets all quality levels
+    be produced from a single copy of the PDF. Does not check that Ghostscript
+    is installed.
+
+    Args:
+        input_path: Path of the PDF file to compress
+        quality: Compression quality level (high, medium, low)
+
+    Returns:
+        Tuple of (compressed_pdf_bytes, original_size, compressed_size)
+
+    Raises:
+        RuntimeError: If compression fails
+    """
+    original_size = os.path.getsize(input_path)
+
+    # Read the result from Ghostscript's stdout rather than an output temp file.
+    # The input stays a file: Ghostscript needs to seek in a PDF, and would
+    # copy one piped to stdin into a temp file of its own anyway.
+    compressed_bytes = _run_ghostscript(input_path, '-', quality)
+    if not compressed_bytes.startswith(b'%PDF'):
+        raise RuntimeError("Ghostscript did not produce a PDF")
+
+    compressed_size = len(compressed_bytes)
+    print(f"[Compress PDF] Compressed ({quality.value}) from {original_size / 1024 / 1024:.2f}MB to {compressed_size / 1024 / 1024:.2f}MB")
+
+    return compressed_bytes, original_size, compressed_size
 
-        # Read compressed file
-        with open(output_path, 'rb') as f:
-            compressed_bytes = f.read()
 
-        compressed_size = len(compressed_bytes)
-        print(f"[Compress PDF] Compressed from {original_size / 1024 / 1024:.2f}MB to {compressed_size / 1024 / 1024:.2f}MB")
+def compress_pdf_to_file(
+    pdf_bytes: PdfBuffer,
+    quality: CompressionQuality = CompressionQuality.MEDIUM
+) -> Tuple[str, int, int]:
+    """
+    Compress a PDF using Ghostscript, leaving the result in a temporary file.
 
-        return compressed_bytes, original_size, compressed_size
+    Args:
+        pdf_bytes: PDF file as bytes or any bytes-like buffer
+        quality: Compression quality level (high, medium, low)
 
+    Returns:
+        Tuple of (output_path, original_size, compressed_size); the caller
+        deletes output_path
+
+    Raises:
+        RuntimeError: If compression fails
+        FileNotFoundError: If Ghostscript is not installed
+    """
+    input_path = _write_temp_pdf(pdf_bytes)
+    try:
+        return compress_pdf_file_to_file(input_path, quality)
     finally:
-        # Clean up temp files
+        # Clean up temp file
         try:
             os.unlink(input_path)
         except:
             pass
-        try:
-            os.unlink(output_path)
-        except:
-            pass
 
 
-def compress_pdf_pypdf(pdf_bytes: bytes) -> Tuple[bytes, int, int]:
+def compress_pdf(
+    pdf_bytes: PdfBuffer,
+    quality: CompressionQuality = CompressionQuality.MEDIUM
+) -> Tuple[bytes, int, int]:
     """
-    Compress a PDF using PyPDF (fallback when Ghostscript is unavailable).
+    Compress a PDF using Ghostscript.
 
     Args:
-        pdf_bytes: PDF file as bytes
+        pdf_bytes: PDF file as bytes or any bytes-like buffer
+        quality: Compression quality level (high, medium, low)
 
     Returns:
         Tuple of (compressed_pdf_bytes, original_size, compressed_size)
+
+    Raises:
+        RuntimeError: If Ghostscript is not available or compression fails
     """
-    original_size = len(pdf_bytes)
+    # First check if Ghostscript is available
+    gs_version = _ghostscript_version()
+    if gs_version is None:
+        raise RuntimeError("Ghostscript not available")
+    print(f"[Compress PDF] Ghostscript version: {gs_version}")
+
+    input_path = _write_temp_pdf(pdf_bytes)
+    try:
+        return compress_pdf_file(input_path, quality)
+    finally:
+        # Clean up temp file
+        try:
+            os.unlink(input_path)
+        except:
+            pass
+
+
+def _recompress_pikepdf(pdf_bytes: PdfBuffer) -> bytes:
+    """Rewrite a PDF with qpdf, recompressing every stream and packing objects into object streams"""
+    with pikepdf.open(io.BytesIO(pdf_bytes)) as pdf:
+        output = io.BytesIO()
+        pdf.save(
+            output,
+            compress_streams=True,
+            recompress_flate=True,
+            object_stream_mode=pikepdf.ObjectStreamMode.generate
+        )
+        return output.getvalue()
+
 
-    # Read and write with PyPDF compression
+def _recompress_pypdf(pdf_bytes: PdfBuffer) -> bytes:
+    """Rewrite a PDF with PyPDF, compressing each page's content streams"""
     reader = PdfReader(io.BytesIO(pdf_bytes))
     writer = PdfWriter()
 
-    # Copy pages and compress
+    # Copy pages and compress (only possible once the page belongs to the writer)
     for page in reader.pages:
-        page.compress_content_streams()  # Compress content streams
-        writer.add_page(page)
+        writer.add_page(page).compress_content_streams()
 
-    # Add compression options
-    writer.add_metadata(reader.metadata)
+    if reader.metadata is not None:
+        writer.add_metadata(reader.metadata)
 
     # Write to bytes with compression
     output = io.BytesIO()
     writer.write(output)
-    compressed_bytes = output.getvalue()
+    return output.getvalue()
+
+
+def compress_pdf_pypdf(pdf_bytes: PdfBuffer) -> Tuple[bytes, int, int]:
+    """
+    Compress a PDF without Ghostscript (fallback when it is unavailable).
+
+    Uses pikepdf (qpdf) when it is installed, which recompresses every
+    stream in C, and PyPDF otherwise.
+
+    Args:
+        pdf_bytes: PDF file as bytes or any bytes-like buffer
+
+    Returns:
+        Tuple of (compressed_pdf_bytes, original_size, compressed_size)
+    """
+    original_size = len(pdf_bytes)
+
+    if pikepdf is not None:
+        compressed_bytes = _recompress_pikepdf(pdf_bytes)
+    else:
+        compressed_bytes = _recompress_pypdf(pdf_bytes)
     compressed_size = len(compressed_bytes)
 
     print(f"[PyPDF Compress] Compressed from {original_size / 1024 / 1024:.2f}MB to {compressed_size / 1024 / 1024:.2f}MB")
@@ -402,13 +889,13 @@ def compress_pdf_pypdf(pdf_bytes: bytes) -> Tuple[bytes, int, int]:
     return compressed_bytes, original_size, compressed_size
 
 
-def compress_pdf_all_qualities(pdf_bytes: bytes) -> Dict[str, Dict[str, any]]:
+def compress_pdf_all_qualities(pdf_bytes: PdfBuffer) -> Dict[str, Dict[str, any]]:
     """
     Compress a PDF to all three quality levels.
     Uses Ghostscript if available, falls back to PyPDF compression.
 
     Args:
-        pdf_bytes: PDF file as bytes
+        pdf_bytes: PDF file as bytes or any bytes-like buffer
 
     Returns:
         Dictionary with compression results for each quality:
@@ -425,36 +912,48 @@ def compress_pdf_all_qualities(pdf_bytes: bytes) -> Dict[str, Dict[str, any]]:
     }
 
     # Check if Ghostscript is available
-    ghostscript_available = False
-    try:
-        gs_check = subprocess.run(['gs', '--version'], capture_output=True, timeout=2)
-        ghostscript_available = gs_check.returncode == 0
-        print(f"[Compress PDF] Ghostscript available: {ghostscript_available}")
-    except:
+    ghostscript_available = _ghostscript_version() is not None
+    if ghostscript_available:
+        print("[Compress PDF] Ghostscript available: True")
+    else:
         print("[Compress PDF] Ghostscript not available, using PyPDF fallback")
 
     if ghostscript_available:
-        # Use Ghostscript for better compression
-        for quality in [CompressionQuality.HIGH, CompressionQuality.MEDIUM, CompressionQuality.LOW]:
-            try:
-                compressed_bytes, _, compressed_size = compress_pdf(pdf_bytes, quality)
-                ratio = round(((original_size - compressed_size) / original_size) * 100)
-
-                results[quality.value] = {
-                    "compressed_bytes": compressed_bytes,
-                    "size": compressed_size,
-                    "ratio": ratio
-                }
-            except Exception as e:
-                print(f"[Compress PDF] Ghostscript error for {quality.value}: {e}")
-                # Fall back to PyPDF
-                compressed_bytes, _, compressed_size = compress_pdf_pypdf(pdf_bytes)
-                ratio = round(((original_size - compressed_size) / original_size) * 100)
-                results[quality.value] = {
-                    "compressed_bytes": compressed_bytes,
-                    "size": compressed_size,
-                    "ratio": ratio
+        # Use Ghostscript for better compression. The quality passes are independent
+        # processes reading the same input file, so they run side by side.
+        qualities = [CompressionQuality.HIGH, CompressionQuality.MEDIUM, CompressionQuality.LOW]
+        input_path = _write_temp_pdf(pdf_bytes)
+        pypdf_result = None
+        try:
+            with ThreadPoolExecutor(max_workers=len(qualities)) as executor:
+                futures = {
+                    quality: executor.submit(compress_pdf_file, input_path, quality)
+                    for quality in qualities
                 }
+
+                for quality, future in futures.items():
+                    try:
+                        compressed_bytes, _, compressed_size = future.result()
+                    except Exception as e:
+                        print(f"[Compress PDF] Ghostscript error for {quality.value}: {e}")
+                        # Fall back to PyPDF, which gives the same result for every
+                        # quality, so parse and compress the PDF at most once
+                        if pypdf_result is None:
+                            pypdf_result = compress_pdf_pypdf(pdf_bytes)
+                        compressed_bytes, _, compressed_size = pypdf_result
+
+                    ratio = round(((original_size - compressed_size) / original_size) * 100)
+                    results[quality.value] = {
+                        "compressed_bytes": compressed_bytes,
+                        "size": compressed_size,
+                        "ratio": ratio
+                    }
+        finally:
+            # Clean up temp file
+            try:
+                os.unlink(input_path)
+            except:
+                pass
     else:
         # Use PyPDF fallback for all qualities
         compressed_bytes, _, compressed_size = compress_pdf_pypdf(pdf_bytes)
@@ -0,0 +1,136 @@
+"""
+Result caching for PDF operations, keyed by a hash of the input PDF and parameters
+"""
+
+import hashlib
+import sys
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+try:
+    from blake3 import blake3
+except ImportError:  # optional speedup, see result_key
+    blake3 = None
+
+
+def result_key(pdf_bytes, *params) -> str:
+    """
+    Hash a PDF and the parameters of the operation applied to it.
+
+    All operations are pure functions of (pdf_bytes, params), so the key
+    identifies the result and doubles as its ETag.
+
+    Args:
+        pdf_bytes: PDF file as bytes or any bytes-like buffer
+        *params: Operation name and parameters (must have a stable repr)
+
+    Returns:
+        Hex digest (32 characters)
+    """
+    # BLAKE3 is SIMD-parallel (several GB/s); otherwise SHA-256, which OpenSSL
+    # runs on SHA-NI where the CPU has it and which then beats BLAKE2b.
+    # 128 bits is plenty for a cache key.
+    if blake3 is not None:
+        digest = blake3(max_threads=blake3.AUTO)
+    else:
+        digest = hashlib.sha256()
+    digest.update(pdf_bytes)
+    digest.update(repr(params).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def result_size(value: Any) -> int:
+    """
+    Approximate memory held by a cached result, counting binary payloads by length.
+
+    Results are bytes, or dicts/lists of metadata around bytes (compressed PDFs,
+    extracted images), so the payloads dominate and are counted exactly. A
+    payload shared by several entries (e.g. one fallback PDF for several
+    qualities) is counted once.
+    """
+    return _result_size(value, set())
+
+
+def _result_size(value: Any, seen: set) -> int:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_result_size(item, seen) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_result_size(item, seen) for item in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Small least-recently-used cache bounded by entry count and, optionally, total size"""
+
+    def __init__(
+        self,
+        maxsize: int = 32,
+        maxbytes: Optional[int] = None,
+        getsizeof: Callable[[Any], int] = result_size
+    ):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.getsizeof = getsizeof
+        self.currbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value (marking it as recently used), or None"""
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._data[key]
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries if full"""
+        size = self.getsizeof(value)
+        if self.maxbytes is not None and size > self.maxbytes:
+            # Would evict everything else and still not fit
+            return
+
+        self._discard(key)
+        self._data[key] = value
+        self._sizes[key] = size
+        self.currbytes += size
+        while len(self._data) > self.maxsize or (
+            self.maxbytes is not None and self.currbytes > self.maxbytes
+        ):
+            self._discard(next(iter(self._data)))
+
+    def clear(self):
+        """Drop every entry (hit/miss counters are kept)"""
+        self._data.clear()
+        self._sizes.clear()
+        self.currbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, size and hit rate, e.g. for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.maxsize,
+            "bytes": self.currbytes,
+            "max_bytes": self.maxbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+    def _discard(self, key: Hashable):
+        if key in self._data:
+            del self._data[key]
+            self.currbytes -= self._sizes.pop(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
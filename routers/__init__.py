@@ -0,0 +1,3 @@
+"""
+API routers, one per PDF feature
+"""
@@ -0,0 +1,22 @@
+"""
+Result cache administration endpoints
+"""
+
+from fastapi import APIRouter
+from routers.common import result_cache
+
+
+router = APIRouter(prefix="/cache")
+
+
+@router.get("/stats", summary="Result cache statistics")
+async def cache_stats():
+    """Number of cached results, memory they hold and hit rate since startup"""
+    return result_cache.stats()
+
+
+@router.post("/clear", summary="Clear the result cache")
+async def cache_clear():
+    """Drop all cached results, e.g. after deploying a change to pdf_utils"""
+    result_cache.clear()
+    return result_cache.stats()
@@ -0,0 +1,141 @@
+"""
+Helpers shared by the PDF routers: upload handling, job offloading and result caching
+"""
+
+import asyncio
+import itertools
+import os
+from typing import AsyncIterator
+
+from buffer_pool import BufferPool
+from fastapi import Depends, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool, iterate_in_threadpool
+from result_cache import LRUCache
+from starlette.formparsers import MultiPartParser
+
+
+# Cap on PDF jobs running at once, so a burst of large uploads can't exhaust memory
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", os.cpu_count() or 1))
+pdf_jobs = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+
+# Keep uploads up to this size in memory instead of spilling them to a temp
+# file (Starlette's default is 1MB), since read_upload copies them into memory anyway
+UPLOAD_SPOOL_MB = int(os.getenv("UPLOAD_SPOOL_MB", 64))
+MultiPartParser.spool_max_size = UPLOAD_SPOOL_MB * 1024 * 1024
+
+# Reusable upload buffers; larger uploads get a one-off buffer instead
+UPLOAD_BUFFER_SIZE = int(os.getenv("UPLOAD_BUFFER_SIZE", 1 << 20))
+upload_buffers = BufferPool(MAX_CONCURRENT_JOBS, UPLOAD_BUFFER_SIZE)
+
+
+async def run_pdf_job(func, *args, **kwargs):
+    """Run a blocking pdf_utils call in the threadpool without blocking the event loop"""
+    async with pdf_jobs:
+        return await run_in_threadpool(func, *args, **kwargs)
+
+
+# Results of recent requests, keyed by a hash of the PDF and parameters, so
+# that retries and repeat uploads of the same file skip the work entirely
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 32))
+RESULT_CACHE_MB = int(os.getenv("RESULT_CACHE_MB", 256))
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", 3600))
+result_cache = LRUCache(maxsize=RESULT_CACHE_SIZE, maxbytes=RESULT_CACHE_MB * 1024 * 1024)
+
+
+async def run_cached_pdf_job(key: str, func, *args, **kwargs):
+    """Like run_pdf_job, but reuses the result of an identical earlier request"""
+    result = result_cache.get(key)
+    if result is None:
+        result = await run_pdf_job(func, *args, **kwargs)
+        result_cache.set(key, result)
+    return result
+
+
+# Set on PDF and ZIP responses: their contents are already compressed, and an
+# explicit Content-Encoding makes GZipMiddleware pass them through untouched
+NO_COMPRESSION_HEADERS = {"Content-Encoding": "identity"}
+
+
+def cache_headers(etag: str) -> dict:
+    """ETag and Cache-Control headers for a cacheable result"""
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={CACHE_MAX_AGE}"
+    }
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Check whether the client already holds this result (If-None-Match)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+async def prime_pdf_job(iterator):
+    """
+    Pull the first item of a blocking pdf_utils iterator in the threadpool.
+
+    Generators only open the PDF on their first step; priming them before a
+    StreamingResponse is built makes errors reading the PDF surface in the
+    endpoint (as a proper error response) rather than after headers are sent.
+
+    Returns:
+        Iterator yielding the same items as iterator
+    """
+    sentinel = object()
+    first = await run_pdf_job(next, iterator, sentinel)
+    if first is sentinel:
+        return iter(())
+    return itertools.chain((first,), iterator)
+
+
+async def iter_pdf_job(iterator):
+    """Consume a blocking pdf_utils iterator in the threadpool, e.g. for a StreamingResponse"""
+    async with pdf_jobs:
+        async for chunk in iterate_in_threadpool(iterator):
+            yield chunk
+
+
+async def validate_pdf_upload(
+    file: UploadFile = File(..., description="PDF file to process")
+) -> UploadFile:
+    """
+    Dependency rejecting uploads that aren't PDFs, before they are copied into memory.
+
+    Checks the declared content type (or .pdf extension), then sniffs the
+    %PDF header, which readers accept anywhere in the first 1024 bytes.
+    """
+    declared_pdf = file.content_type == "application/pdf" or (file.filename or "").lower().endswith(".pdf")
+    if not declared_pdf or b"%PDF" not in await file.read(1024):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    return file
+
+
+async def read_upload(file: UploadFile = Depends(validate_pdf_upload)) -> AsyncIterator[memoryview]:
+    """
+    Dependency reading a validated upload into a single buffer sized from the upload.
+
+    The spooled upload is copied once, straight into a buffer borrowed from
+    upload_buffers, and handed to pdf_utils as a memoryview so no further
+    copies are made before parsing. The buffer goes back to the pool once the
+    response (including any streamed body) has been sent.
+    """
+    # validate_pdf_upload has already read the first bytes
+    await file.seek(0)
+    if file.size is None:
+        yield memoryview(await file.read())
+        return
+
+    with upload_buffers.acquire(file.size) as buffer:
+        view = memoryview(buffer)[:file.size]
+
+        offset = 0
+        while offset < file.size:
+            read = await run_in_threadpool(file.file.readinto, view[offset:])
+            if not read:
+                break
+            offset += read
+
+        yield view[:offset]
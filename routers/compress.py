@@ -0,0 +1,194 @@
+"""
+PDF compression endpoint
+"""
+
+import os
+import subprocess
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from json_stream import Base64, iter_json
+from pdf_utils import (
+    compress_pdf_all_qualities,
+    compress_pdf_pypdf,
+    compress_pdf_to_file,
+    CompressionQuality
+)
+from result_cache import result_key
+from routers.common import (
+    NO_COMPRESSION_HEADERS,
+    cache_headers,
+    is_not_modified,
+    read_upload,
+    result_cache,
+    run_cached_pdf_job,
+    run_pdf_job,
+    validate_pdf_upload
+)
+from starlette.background import BackgroundTask
+from zip_stream import iter_zip
+
+
+router = APIRouter()
+
+
+def quality_headers(quality: str, original_size: int, size: int) -> dict:
+    """X-Original-Size and X-Quality-<Quality>-{Size,Ratio} headers for one quality level"""
+    return {
+        "X-Original-Size": str(original_size),
+        f"X-Quality-{quality.title()}-Size": str(size),
+        f"X-Quality-{quality.title()}-Ratio": str(round(((original_size - size) / original_size) * 100))
+    }
+
+
+async def compress_single_quality(
+    pdf_bytes: memoryview,
+    quality: CompressionQuality,
+    key: str,
+    headers: dict
+) -> Response:
+    """
+    Compress to one quality level and send the PDF itself.
+
+    Ghostscript's output file is sent with FileResponse (sendfile where the
+    server supports it) and deleted afterwards, so it is never read back into
+    memory. Results already cached for all qualities are sent from memory.
+    """
+    results = result_cache.get(key)
+    if results is not None:
+        compressed = results[quality.value]
+        return Response(
+            compressed["compressed_bytes"],
+            media_type="application/pdf",
+            headers={**headers, **quality_headers(quality.value, results["original_size"], compressed["size"])}
+        )
+
+    try:
+        output_path, original_size, compressed_size = await run_pdf_job(compress_pdf_to_file, pdf_bytes, quality)
+    except (RuntimeError, OSError, subprocess.SubprocessError) as e:
+        print(f"[Compress PDF] Ghostscript error for {quality.value}, using PyPDF fallback: {e}")
+        compressed_bytes, original_size, compressed_size = await run_pdf_job(compress_pdf_pypdf, pdf_bytes)
+        return Response(
+            compressed_bytes,
+            media_type="application/pdf",
+            headers={**headers, **quality_headers(quality.value, original_size, compressed_size)}
+        )
+
+    return FileResponse(
+        output_path,
+        media_type="application/pdf",
+        headers={**headers, **quality_headers(quality.value, original_size, compressed_size)},
+        background=BackgroundTask(os.unlink, output_path)
+    )
+
+
+@router.post("/compress-pdf", summary="Compress PDF to all quality levels")
+async def compress_pdf_endpoint(
+    request: Request,
+    file: UploadFile = Depends(validate_pdf_upload),
+    pdf_bytes: memoryview = Depends(read_upload),
+    quality: Optional[CompressionQuality] = Form(
+        None,
+        description="Only compress to this quality level and return the PDF itself"
+    )
+):
+    """
+    Compress a PDF to all three quality levels using Ghostscript.
+
+    **Features:**
+    - High quality: 150 DPI, ~25% size reduction
+    - Medium quality: 100 DPI, ~45% size reduction
+    - Low quality: 72 DPI, ~65% size reduction
+    - Returns base64-encoded PDFs for all quality levels
+
+    **Returns:**
+    JSON with compressed PDFs in base64 format for each quality level:
+    - originalSize: Original file size in bytes
+    - qualities.high/medium/low: Compressed data with size and ratio
+
+    With `Accept: application/zip`, the PDFs are streamed instead as a ZIP
+    (high_/medium_/low_<filename>), with sizes and ratios in the
+    X-Original-Size and X-Quality-{High,Medium,Low}-{Size,Ratio} headers.
+
+    With a `quality` form field, only that level is produced and the PDF is
+    returned directly (<quality>_<filename>), with the same headers.
+    """
+    try:
+        file_size_mb = len(pdf_bytes) / 1024 / 1024
+        print(f"[Compress PDF] Processing {file.filename} ({file_size_mb:.2f}MB)")
+
+        # The ZIP, JSON and single-quality responses share the cached result but need distinct ETags
+        as_zip = "application/zip" in request.headers.get("accept", "")
+        key = await run_in_threadpool(result_key, pdf_bytes, "compress-pdf")
+        if quality is not None:
+            etag = f'"{key}-{quality.value}"'
+        else:
+            etag = f'"{key}-zip"' if as_zip else f'"{key}"'
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers={**cache_headers(etag), "Vary": "Accept"})
+
+        if quality is not None:
+            print(f"[Compress PDF] Compressing {file.filename} to {quality.value} quality only")
+            return await compress_single_quality(
+                pdf_bytes,
+                quality,
+                key,
+                headers={
+                    "Content-Disposition": f"attachment; filename={quality.value}_{file.filename}",
+                    **cache_headers(etag),
+                    **NO_COMPRESSION_HEADERS
+                }
+            )
+
+        # Compress to all quality levels
+        results = await run_cached_pdf_job(key, compress_pdf_all_qualities, pdf_bytes)
+
+        if as_zip:
+            qualities = [level.value for level in CompressionQuality]
+            headers = {
+                "Content-Disposition": f"attachment; filename=compressed_{file.filename.rsplit('.', 1)[0]}.zip",
+                "X-Original-Size": str(results["original_size"]),
+                "Vary": "Accept",
+                **cache_headers(etag),
+                **NO_COMPRESSION_HEADERS
+            }
+            for level in qualities:
+                headers[f"X-Quality-{level.title()}-Size"] = str(results[level]["size"])
+                headers[f"X-Quality-{level.title()}-Ratio"] = str(results[level]["ratio"])
+
+            entries = (
+                (f"{level}_{file.filename}", results[level]["compressed_bytes"])
+                for level in qualities
+            )
+
+            print(f"[Compress PDF] Compression complete for {file.filename}")
+            return StreamingResponse(iter_zip(entries), media_type="application/zip", headers=headers)
+
+        # Stream the JSON body, base64-encoding each PDF in chunks
+        response_body = {
+            "success": True,
+            "originalSize": results["original_size"],
+            "qualities": {
+                level.value: {
+                    "size": results[level.value]["size"],
+                    "ratio": results[level.value]["ratio"],
+                    "blob": Base64(results[level.value]["compressed_bytes"])
+                }
+                for level in CompressionQuality
+            }
+        }
+
+        print(f"[Compress PDF] Compression complete for {file.filename}")
+        return StreamingResponse(
+            iter_json(response_body),
+            media_type="application/json",
+            headers={**cache_headers(etag), "Vary": "Accept"}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[Compress PDF] Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Error compressing PDF: {str(e)}")
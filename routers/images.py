@@ -0,0 +1,131 @@
+"""
+Image extraction endpoint
+"""
+
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from json_stream import Base64, iter_json
+from pdf_utils import extract_images_from_pdf, iter_images_from_pdf
+from result_cache import result_key
+from routers.common import (
+    NO_COMPRESSION_HEADERS,
+    cache_headers,
+    is_not_modified,
+    iter_pdf_job,
+    prime_pdf_job,
+    read_upload,
+    result_cache,
+    run_cached_pdf_job,
+    validate_pdf_upload
+)
+from zip_stream import iter_zip
+
+
+router = APIRouter()
+
+
+# File extensions for the image formats returned by pdf_utils
+IMAGE_EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "JPEG2000": "jp2"}
+
+
+def image_zip_entries(images):
+    """ZIP entries for extracted images, followed by a manifest.json describing them"""
+    manifest = []
+    for img_data in images:
+        name = f"page{img_data['page']}_idx{img_data['index']}.{IMAGE_EXTENSIONS.get(img_data['format'], 'bin')}"
+        manifest.append({
+            "filename": name,
+            "page": img_data['page'],
+            "index": img_data['index'],
+            "width": img_data['width'],
+            "height": img_data['height'],
+            "format": img_data['format'],
+            "original_format": img_data.get('original_format', img_data['format'])
+        })
+        yield name, img_data['image_bytes']
+
+    yield "manifest.json", json.dumps({"total_images": len(manifest), "images": manifest}).encode('utf-8')
+
+
+@router.post("/extract-images", summary="Extract images from PDF")
+async def extract_images_endpoint(
+    request: Request,
+    file: UploadFile = Depends(validate_pdf_upload),
+    pdf_bytes: memoryview = Depends(read_upload)
+):
+    """
+    Extract all images from a PDF document (fast PyMuPDF extraction).
+
+    **Features:**
+    - Fast extraction using PyMuPDF (PyPDF when it isn't installed)
+    - JPEG and JPEG 2000 images returned as stored in the PDF, all others converted to PNG
+    - Provides metadata (page number, dimensions, format)
+    - Returns base64-encoded images for frontend preview and download
+
+    **Returns:**
+    JSON with list of images and metadata. Each image includes:
+    - image_base64: Base64-encoded image data (JPEG, JPEG 2000 or PNG)
+    - page: Page number where image appears
+    - index: Unique index for the image
+    - width/height: Image dimensions
+    - format: Output format (JPEG, JPEG2000 or PNG)
+    - original_format: Original format in PDF (JPEG, PNG, etc.)
+
+    With `Accept: application/zip`, the images are streamed instead as a ZIP of
+    page{n}_idx{i}.jpg/.jp2/.png files as they are extracted, ending with a manifest.json
+    holding the metadata above.
+    """
+    try:
+        as_zip = "application/zip" in request.headers.get("accept", "")
+        key = await run_in_threadpool(result_key, pdf_bytes, "extract-images")
+        etag = f'"{key}-zip"' if as_zip else f'"{key}"'
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers={**cache_headers(etag), "Vary": "Accept"})
+
+        if as_zip:
+            # Stream images as they are extracted, unless an earlier request already has them
+            images = result_cache.get(key)
+            if images is None:
+                images = await prime_pdf_job(iter_images_from_pdf(pdf_bytes))
+
+            return StreamingResponse(
+                iter_pdf_job(iter_zip(image_zip_entries(images))),
+                media_type="application/zip",
+                headers={
+                    "Content-Disposition": f"attachment; filename=images_{file.filename.rsplit('.', 1)[0]}.zip",
+                    "Vary": "Accept",
+                    **cache_headers(etag),
+                    **NO_COMPRESSION_HEADERS
+                }
+            )
+
+        # Extract images
+        images = await run_cached_pdf_job(key, extract_images_from_pdf, pdf_bytes)
+
+        # Stream the JSON body, base64-encoding each image in chunks
+        result = []
+        for img_data in images:
+            result.append({
+                "image_base64": Base64(img_data['image_bytes']),
+                "page": img_data['page'],
+                "index": img_data['index'],
+                "width": img_data['width'],
+                "height": img_data['height'],
+                "format": img_data['format'],
+                "original_format": img_data.get('original_format', img_data['format'])
+            })
+
+        return StreamingResponse(
+            iter_json({
+                "total_images": len(result),
+                "images": result
+            }),
+            media_type="application/json",
+            headers={**cache_headers(etag), "Vary": "Accept"}
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error extracting images: {str(e)}")
@@ -0,0 +1,103 @@
+"""
+Page numbering endpoint
+"""
+
+import io
+
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from pdf_utils import add_page_numbers, compile_page_number_format, PageNumberPosition
+from result_cache import result_key
+from routers.common import (
+    NO_COMPRESSION_HEADERS,
+    cache_headers,
+    is_not_modified,
+    read_upload,
+    run_cached_pdf_job,
+    validate_pdf_upload
+)
+
+
+router = APIRouter()
+
+
+@router.post("/add-page-numbers", summary="Add page numbers to PDF")
+async def add_page_numbers_endpoint(
+    request: Request,
+    file: UploadFile = Depends(validate_pdf_upload),
+    pdf_bytes: memoryview = Depends(read_upload),
+    position: PageNumberPosition = Form(
+        PageNumberPosition.BOTTOM_CENTER,
+        description="Position of page numbers on the page"
+    ),
+    font_size: int = Form(12, description="Font size for page numbers", ge=6, le=72),
+    margin: int = Form(30, description="Margin from edge in points", ge=0),
+    start_page: int = Form(1, description="Starting page number", ge=1),
+    format_string: str = Form(
+        "{page}",
+        description="Format string (use {page} for page number, {total} for total pages)"
+    ),
+    font_color_r: int = Form(0, description="Red component (0-255)", ge=0, le=255),
+    font_color_g: int = Form(0, description="Green component (0-255)", ge=0, le=255),
+    font_color_b: int = Form(0, description="Blue component (0-255)", ge=0, le=255)
+):
+    """
+    Add page numbers to a PDF document using ReportLab and PyPDF (fully open-source).
+
+    **9 Positions Available:**
+    - top_left, top_center, top_right
+    - middle_left, middle_center, middle_right
+    - bottom_left, bottom_center, bottom_right
+
+    **Parameters:**
+    - **file**: PDF file to process
+    - **position**: Where to place page numbers
+    - **font_size**: Size of the page number text (6-72)
+    - **margin**: Distance from edge in points
+    - **start_page**: What number to start counting from
+    - **format_string**: How to format page numbers (e.g., "Page {page}", "{page}/{total}"); only {page} and {total} are allowed
+    - **font_color_r/g/b**: RGB color components (0-255)
+    """
+    # Reject bad format strings up front, as a client error
+    try:
+        compile_page_number_format(format_string)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        font_color = (font_color_r, font_color_g, font_color_b)
+        key = await run_in_threadpool(
+            result_key, pdf_bytes, "add-page-numbers",
+            position.value, font_size, font_color, margin, start_page, format_string
+        )
+        etag = f'"{key}"'
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=cache_headers(etag))
+
+        # Add page numbers
+        result_bytes = await run_cached_pdf_job(
+            key,
+            add_page_numbers,
+            pdf_bytes=pdf_bytes,
+            position=position,
+            font_size=font_size,
+            font_color=font_color,
+            margin=margin,
+            start_page=start_page,
+            format_string=format_string
+        )
+
+        # Return modified PDF
+        return StreamingResponse(
+            io.BytesIO(result_bytes),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f"attachment; filename=numbered_{file.filename}",
+                **cache_headers(etag),
+                **NO_COMPRESSION_HEADERS
+            }
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
@@ -0,0 +1,51 @@
+"""
+Numeric checks used by table detection, compiled with Numba when it is installed
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # optional speedup, the NumPy versions give the same results
+    njit = None
+
+
+def _gaps_exceed_numpy(xs: np.ndarray, widths: np.ndarray, threshold: float) -> bool:
+    """Whether any gap between consecutive spans (sorted by X) exceeds threshold"""
+    gaps = xs[1:] - (xs[:-1] + widths[:-1])
+    return bool(np.any(gaps > threshold))
+
+
+def _any_near_numpy(xs: np.ndarray, cols: np.ndarray, tolerance: float) -> bool:
+    """Whether any X lies within tolerance of any column position"""
+    return bool(np.abs(xs[:, None] - cols[None, :]).min() < tolerance)
+
+
+def _gaps_exceed_loop(xs, widths, threshold):
+    """Whether any gap between consecutive spans (sorted by X) exceeds threshold"""
+    for i in range(len(xs) - 1):
+        if xs[i + 1] - (xs[i] + widths[i]) > threshold:
+            return True
+    return False
+
+
+def _any_near_loop(xs, cols, tolerance):
+    """Whether any X lies within tolerance of any column position"""
+    for x in xs:
+        for col in cols:
+            if abs(x - col) < tolerance:
+                return True
+    return False
+
+
+if njit is not None:
+    gaps_exceed = njit(cache=True)(_gaps_exceed_loop)
+    any_near = njit(cache=True)(_any_near_loop)
+
+    # Compile now rather than on the first page converted
+    _sample = np.zeros(2)
+    gaps_exceed(_sample, _sample, 0.0)
+    any_near(_sample, _sample, 0.0)
+else:
+    gaps_exceed = _gaps_exceed_numpy
+    any_near = _any_near_numpy
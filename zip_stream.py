@@ -0,0 +1,50 @@
+"""
+Streaming ZIP archives for API responses
+"""
+
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+
+
+class _ChunkSink:
+    """Write-only file object that collects what ZipFile writes until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> List[bytes]:
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def iter_zip(entries: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """
+    Build a ZIP archive on the fly, yielding it chunk by chunk.
+
+    Entries are stored as-is (PDF and image data is already compressed) and
+    each one is yielded as soon as it has been written, so the archive is never
+    held in memory as a whole.
+
+    Args:
+        entries: (filename, data) pairs, consumed lazily
+
+    Example:
+        >>> StreamingResponse(iter_zip([("a.pdf", data)]), media_type="application/zip")
+    """
+    sink = _ChunkSink()
+
+    # ZipFile falls back to data descriptors when the target isn't seekable
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+            yield from sink.drain()
+
+    # Central directory
+    yield from sink.drain()